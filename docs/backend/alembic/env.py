@@ -21,6 +21,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        compare_server_default=True,
     )
 
     with context.begin_transaction():
@@ -38,7 +39,10 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            # Timestamps default server-side (UTC_NOW); autogenerate only
+            # emits server_default changes when asked to compare them
+            compare_server_default=True
         )
 
         with context.begin_transaction():
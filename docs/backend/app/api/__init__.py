@@ -6,10 +6,31 @@ from app.api.analysis import router as analysis_router
 from app.api.deep_analysis import router as deep_analysis_router
 from app.api.ask_ai import router as ask_ai_router
 
+# Single registration table: prefix and tags live here only,
+# so each child router is included exactly once.
+ROUTERS = (
+    (tenders_router, "/tenders", ["tenders"]),
+    (scraping_router, "/scraping", ["scraping"]),
+    (extraction_router, "/extraction", ["extraction"]),
+    (analysis_router, "/analysis", ["analysis"]),
+    (deep_analysis_router, "/deep-analysis", ["deep-analysis"]),
+    (ask_ai_router, "/ask", ["ask-ai"]),
+)
+
 api_router = APIRouter()
-api_router.include_router(tenders_router, prefix="/tenders", tags=["tenders"])
-api_router.include_router(scraping_router, prefix="/scraping", tags=["scraping"])
-api_router.include_router(extraction_router, prefix="/extraction", tags=["extraction"])
-api_router.include_router(analysis_router, prefix="/analysis", tags=["analysis"])
-api_router.include_router(deep_analysis_router, prefix="/deep-analysis", tags=["deep-analysis"])
-api_router.include_router(ask_ai_router, prefix="/ask", tags=["ask-ai"])
+for router, prefix, tags in ROUTERS:
+    api_router.include_router(router, prefix=prefix, tags=tags)
+
+
+def _assert_unique_routes(router: APIRouter) -> None:
+    """Fail at import if two route functions share a (path, method) pair."""
+    seen = set()
+    for route in router.routes:
+        for method in getattr(route, "methods", None) or ():
+            key = (route.path, method)
+            if key in seen:
+                raise RuntimeError(f"Duplicate route registered: {method} {route.path}")
+            seen.add(key)
+
+
+_assert_unique_routes(api_router)
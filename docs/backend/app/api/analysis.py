@@ -7,15 +7,19 @@ Extracts searchable listing metadata with zero inference and full traceability.
 
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, run_with_session
+from app.api.deps import require_ai_capacity
 from app.services.ai_db import AIDBService
+from app.services.coalesce import ai_calls
 
 
-router = APIRouter(prefix="/analysis", tags=["analysis"])
+router = APIRouter()
 
 
 class AnalysisStatus(BaseModel):
@@ -48,33 +52,38 @@ class AnalysisResponse(BaseModel):
     keywords_generated: bool = False
 
 
-@router.get("/status", response_model=AnalysisStatus)
+def _avis_key(tender_id: UUID, website_deadline: Optional[dict]) -> tuple:
+    """Coalescing key: same tender and same deadline override share one call."""
+    deadline = website_deadline or {}
+    return ("avis", tender_id, deadline.get("date"), deadline.get("time"))
+
+
+@router.get("/status", responses={200: {"model": AnalysisStatus}})
 def get_analysis_status(db: Session = Depends(get_db)):
     """
     Check if AI Process 1 (Avis Extraction) is configured.
     """
     service = AIDBService(db)
     
-    from app.config import settings
-    
     if service.is_configured():
-        return AnalysisStatus(
-            configured=True,
-            model=settings.deepseek_model,
-            message="DeepSeek API is configured - Avis extraction ready"
-        )
+        configured = True
+        message = "DeepSeek API is configured - Avis extraction ready"
     else:
-        return AnalysisStatus(
-            configured=False,
-            model=settings.deepseek_model,
-            message="DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
-        )
+        configured = False
+        message = "DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
+    
+    return ORJSONResponse(content={
+        "configured": configured,
+        "model": settings.deepseek_model,
+        "message": message,
+        "process": "AI Process 1 - Avis Metadata Extraction"
+    })
 
 
 @router.post("/trigger", response_model=AnalysisResponse)
 async def trigger_analysis(
     request: AnalysisTrigger,
-    db: Session = Depends(get_db)
+    _: None = Depends(require_ai_capacity)
 ):
     """
     Trigger AI Process 1 — Avis Metadata Extraction.
@@ -88,14 +97,6 @@ async def trigger_analysis(
     - Multilingual keywords (FR, EN, AR)
     - Full provenance tracking
     """
-    service = AIDBService(db)
-    
-    if not service.is_configured():
-        raise HTTPException(
-            status_code=503,
-            detail="DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
-        )
-    
     # Prepare website deadline if provided
     website_deadline = None
     if request.website_deadline:
@@ -105,9 +106,12 @@ async def trigger_analysis(
         }
     
     if request.tender_id:
-        result = await service.analyze_tender(
-            request.tender_id,
-            website_deadline=website_deadline
+        result = await ai_calls.run(
+            _avis_key(request.tender_id, website_deadline),
+            lambda: run_with_session(lambda db: AIDBService(db).analyze_tender(
+                request.tender_id,
+                website_deadline=website_deadline
+            ))
         )
         
         if "error" in result:
@@ -122,7 +126,10 @@ async def trigger_analysis(
             keywords_generated=result["fields_extracted"] > 0
         )
     else:
-        result = await service.analyze_pending_tenders()
+        result = await ai_calls.run(
+            ("avis-pending", 10),
+            lambda: run_with_session(lambda db: AIDBService(db).analyze_pending_tenders())
+        )
         
         return AnalysisResponse(
             status="completed",
@@ -137,7 +144,7 @@ async def trigger_analysis(
 async def analyze_tender(
     tender_id: UUID,
     website_deadline: Optional[WebsiteDeadline] = None,
-    db: Session = Depends(get_db)
+    _: None = Depends(require_ai_capacity)
 ):
     """
     Run AI Process 1 on a specific tender.
@@ -156,19 +163,16 @@ async def analyze_tender(
     3. Annexes (override logic applies)
     4. Website (deadline override only)
     """
-    service = AIDBService(db)
-    
-    if not service.is_configured():
-        raise HTTPException(
-            status_code=503,
-            detail="DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
-        )
-    
     ws_deadline = None
     if website_deadline:
         ws_deadline = {"date": website_deadline.date, "time": website_deadline.time}
     
-    result = await service.analyze_tender(tender_id, website_deadline=ws_deadline)
+    result = await ai_calls.run(
+        _avis_key(tender_id, ws_deadline),
+        lambda: run_with_session(
+            lambda db: AIDBService(db).analyze_tender(tender_id, website_deadline=ws_deadline)
+        )
+    )
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -187,22 +191,17 @@ async def analyze_tender(
 @router.post("/pending")
 async def analyze_pending(
     limit: int = 10,
-    db: Session = Depends(get_db)
+    _: None = Depends(require_ai_capacity)
 ):
     """
     Night Shift batch processing.
     
     Analyze all tenders with extracted text but no Avis metadata.
     """
-    service = AIDBService(db)
-    
-    if not service.is_configured():
-        raise HTTPException(
-            status_code=503,
-            detail="DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
-        )
-    
-    result = await service.analyze_pending_tenders(limit=limit)
+    result = await ai_calls.run(
+        ("avis-pending", limit),
+        lambda: run_with_session(lambda db: AIDBService(db).analyze_pending_tenders(limit=limit))
+    )
     
     return {
         "status": "completed",
@@ -7,15 +7,18 @@ Supports French and Moroccan Darija.
 
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal
 
+from app.config import settings
 from app.database import get_db
+from app.api.deps import require_ai_capacity
 from app.services.ask_ai_db import AskAIDBService
 
 
-router = APIRouter(prefix="/ask", tags=["ask-ai"])
+router = APIRouter()
 
 
 class ConversationEntry(BaseModel):
@@ -74,8 +77,6 @@ def get_ask_ai_status(db: Session = Depends(get_db)):
     """
     service = AskAIDBService(db)
     
-    from app.config import settings
-    
     if service.is_configured():
         return {
             "configured": True,
@@ -91,7 +92,7 @@ def get_ask_ai_status(db: Session = Depends(get_db)):
         }
 
 
-@router.get("/tender/{tender_id}/summary", response_model=TenderSummary)
+@router.get("/tender/{tender_id}/summary", responses={200: {"model": TenderSummary}})
 def get_tender_summary(
     tender_id: UUID,
     db: Session = Depends(get_db)
@@ -107,13 +108,13 @@ def get_tender_summary(
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     
-    return result
+    return ORJSONResponse(content=result)
 
 
 @router.get("/tender/{tender_id}/suggestions")
 def get_suggested_questions(
     tender_id: UUID,
-    language: str = "fr",
+    language: Literal["fr", "ar-ma"] = "fr",
     db: Session = Depends(get_db)
 ):
     """
@@ -125,10 +126,6 @@ def get_suggested_questions(
     """
     service = AskAIDBService(db)
     
-    # Validate language
-    if language not in ["fr", "ar-ma"]:
-        language = "fr"
-    
     questions = service.get_suggested_questions(tender_id, language)
     
     return {
@@ -141,7 +138,8 @@ def get_suggested_questions(
 async def ask_about_tender(
     tender_id: UUID,
     request: AskRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    _: None = Depends(require_ai_capacity)
 ):
     """
     Ask a question about a tender.
@@ -156,12 +154,6 @@ async def ask_about_tender(
     """
     service = AskAIDBService(db)
     
-    if not service.is_configured():
-        raise HTTPException(
-            status_code=503,
-            detail="DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
-        )
-    
     # Convert conversation history to dict format
     history = None
     if request.conversation_history:
@@ -186,7 +178,8 @@ async def ask_about_tender(
 async def quick_ask(
     tender_id: UUID,
     question: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    _: None = Depends(require_ai_capacity)
 ):
     """
     Quick ask endpoint - simple GET-like interface.
@@ -195,12 +188,6 @@ async def quick_ask(
     """
     service = AskAIDBService(db)
     
-    if not service.is_configured():
-        raise HTTPException(
-            status_code=503,
-            detail="DeepSeek API key not configured"
-        )
-    
     result = await service.ask_about_tender(
         tender_id=tender_id,
         question=question
@@ -8,15 +8,22 @@ This phase is expensive and must only run on user intent.
 
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, load_only
 from pydantic import BaseModel
 from typing import Optional, Any, List
 
-from app.database import get_db
-from app.services.deep_analysis_db import DeepAnalysisDBService
+from app.database import get_db, run_with_session
+from app.models.tender import TenderField, TenderDocument
+from app.api.deps import require_deepseek, ensure_ai_capacity
+from app.services.deep_analysis_db import DeepAnalysisDBService, deep_analysis_cache
+from app.services.coalesce import ai_calls
 
 
-router = APIRouter(prefix="/deep-analysis", tags=["deep-analysis"])
+router = APIRouter(default_response_class=ORJSONResponse)
+
+DEEP_PROCESS = "AI Process 2 - Universal Deep Analysis"
 
 
 class DeepAnalysisStatus(BaseModel):
@@ -25,13 +32,13 @@ class DeepAnalysisStatus(BaseModel):
     needs_analysis: bool
     has_analysis: bool
     message: str
-    process: str = "AI Process 2 - Universal Deep Analysis"
+    process: str = DEEP_PROCESS
 
 
 class DeepAnalysisResult(BaseModel):
     """Universal Deep Analysis result."""
     status: str
-    process: str = "AI Process 2 - Universal Deep Analysis"
+    process: str = DEEP_PROCESS
     tender_id: str
     reference: Optional[str] = None
     fields_extracted: int = 0
@@ -43,7 +50,7 @@ class DeepAnalysisResult(BaseModel):
     error: Optional[str] = None
 
 
-@router.get("/status/{tender_id}", response_model=DeepAnalysisStatus)
+@router.get("/status/{tender_id}", responses={200: {"model": DeepAnalysisStatus}})
 def get_deep_analysis_status(
     tender_id: UUID,
     db: Session = Depends(get_db)
@@ -59,29 +66,25 @@ def get_deep_analysis_status(
     existing = service.get_deep_analysis(tender_id)
     
     if existing:
-        return DeepAnalysisStatus(
-            tender_id=str(tender_id),
-            needs_analysis=False,
-            has_analysis=True,
-            message="Deep analysis available"
-        )
+        needs_analysis, has_analysis = False, True
+        message = "Deep analysis available"
     elif needs:
-        return DeepAnalysisStatus(
-            tender_id=str(tender_id),
-            needs_analysis=True,
-            has_analysis=False,
-            message="Tender ready for deep analysis"
-        )
+        needs_analysis, has_analysis = True, False
+        message = "Tender ready for deep analysis"
     else:
-        return DeepAnalysisStatus(
-            tender_id=str(tender_id),
-            needs_analysis=False,
-            has_analysis=False,
-            message="No extracted text available for analysis"
-        )
+        needs_analysis, has_analysis = False, False
+        message = "No extracted text available for analysis"
+    
+    return ORJSONResponse(content={
+        "tender_id": tender_id,
+        "needs_analysis": needs_analysis,
+        "has_analysis": has_analysis,
+        "message": message,
+        "process": DEEP_PROCESS
+    })
 
 
-@router.get("/{tender_id}", response_model=DeepAnalysisResult)
+@router.get("/{tender_id}", responses={200: {"model": DeepAnalysisResult}})
 def get_deep_analysis(
     tender_id: UUID,
     db: Session = Depends(get_db)
@@ -95,29 +98,42 @@ def get_deep_analysis(
     
     existing = service.get_deep_analysis(tender_id)
     
+    # Same shape as DeepAnalysisResult
+    content = {
+        "status": "not_found",
+        "process": DEEP_PROCESS,
+        "tender_id": tender_id,
+        "reference": None,
+        "fields_extracted": 0,
+        "lots_found": 0,
+        "items_found": 0,
+        "has_execution_dates": False,
+        "confidence_score": 0.0,
+        "analysis": None,
+        "error": "No deep analysis available. Trigger analysis first."
+    }
+    
     if existing:
-        return DeepAnalysisResult(
+        lots_found = len(existing.get("lots", []))
+        content.update(
             status="completed",
-            tender_id=str(tender_id),
-            fields_extracted=len(existing.get("lots", [])) + 10,  # Approximate
-            lots_found=len(existing.get("lots", [])),
+            fields_extracted=lots_found + 10,  # Approximate
+            lots_found=lots_found,
             has_execution_dates=existing.get("execution_dates") is not None,
             confidence_score=existing.get("confidence_score", 0.0),
-            analysis=existing
-        )
-    else:
-        return DeepAnalysisResult(
-            status="not_found",
-            tender_id=str(tender_id),
-            error="No deep analysis available. Trigger analysis first."
+            analysis=existing,
+            error=None
         )
+    
+    return ORJSONResponse(content=content)
 
 
 @router.post("/{tender_id}", response_model=DeepAnalysisResult)
 async def trigger_deep_analysis(
     tender_id: UUID,
     force: bool = False,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    _: None = Depends(require_deepseek)
 ):
     """
     Trigger on-demand deep analysis for a tender.
@@ -130,29 +146,36 @@ async def trigger_deep_analysis(
         force: If True, re-analyze even if already analyzed
     """
     service = DeepAnalysisDBService(db)
-    
-    # Check API configuration
-    if not service.is_configured():
-        raise HTTPException(
-            status_code=503,
-            detail="DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
-        )
+    tid = str(tender_id)
     
     # Check if already analyzed (unless force)
     if not force:
-        existing = service.get_deep_analysis(tender_id)
+        # Hot path: in-process cache hit never touches Postgres or a thread
+        existing = deep_analysis_cache.get(tid)
+        if existing is None:
+            existing = await run_in_threadpool(service.get_deep_analysis, tender_id)
         if existing:
             return DeepAnalysisResult(
                 status="cached",
-                tender_id=str(tender_id),
+                tender_id=tid,
                 lots_found=len(existing.get("lots", [])),
                 has_execution_dates=existing.get("execution_dates") is not None,
                 confidence_score=existing.get("confidence_score", 0.0),
                 analysis=existing
             )
     
-    # Perform analysis
-    result = await service.perform_deep_analysis(tender_id)
+    ensure_ai_capacity()
+    
+    # Perform analysis (concurrent non-forced requests share one call)
+    if force:
+        result = await service.perform_deep_analysis(tender_id, force=True)
+    else:
+        result = await ai_calls.run(
+            ("deep", tender_id),
+            lambda: run_with_session(
+                lambda db: DeepAnalysisDBService(db).perform_deep_analysis(tender_id)
+            )
+        )
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -191,13 +214,13 @@ def get_tender_lots(
     
     lots = existing.get("lots", [])
     
-    return {
-        "tender_id": str(tender_id),
+    return ORJSONResponse(content={
+        "tender_id": tender_id,
         "lots_count": len(lots),
         "lots": lots,
         "single_lot_only": existing.get("single_lot_only", False),
         "all_lots_required": existing.get("all_lots_required", False)
-    }
+    })
 
 
 @router.get("/{tender_id}/execution")
@@ -222,11 +245,11 @@ def get_execution_dates(
     
     execution_dates = existing.get("execution_dates")
     
-    return {
-        "tender_id": str(tender_id),
+    return ORJSONResponse(content={
+        "tender_id": tender_id,
         "has_dates": execution_dates is not None,
         "execution_dates": execution_dates
-    }
+    })
 
 
 @router.get("/{tender_id}/provenance")
@@ -239,23 +262,26 @@ def get_field_provenance(
     
     Shows source document and confidence for each extracted field.
     """
-    from app.models.tender import TenderField, TenderDocument
-    
-    fields = db.query(TenderField).filter(
+    # One query: fields joined to their source document, without field_value
+    rows = db.query(TenderField, TenderDocument.filename).outerjoin(
+        TenderDocument, TenderField.document_id == TenderDocument.id
+    ).options(
+        load_only(
+            TenderField.field_name,
+            TenderField.field_type,
+            TenderField.source,
+            TenderField.confidence,
+            TenderField.source_location,
+            TenderField.is_verified,
+            TenderField.created_at,
+            TenderField.updated_at
+        )
+    ).filter(
         TenderField.tender_id == tender_id
-    ).all()
+    ).yield_per(100)  # stream rows in batches instead of materializing all ORM objects
     
-    provenance = []
-    for field in fields:
-        doc_name = None
-        if field.document_id:
-            doc = db.query(TenderDocument).filter(
-                TenderDocument.id == field.document_id
-            ).first()
-            if doc:
-                doc_name = doc.filename
-        
-        provenance.append({
+    provenance = [
+        {
             "field_name": field.field_name,
             "field_type": field.field_type,
             "source": field.source.value if field.source else "unknown",
@@ -263,12 +289,15 @@ def get_field_provenance(
             "source_document": doc_name,
             "source_location": field.source_location,
             "is_verified": field.is_verified,
-            "created_at": field.created_at.isoformat() if field.created_at else None,
-            "updated_at": field.updated_at.isoformat() if field.updated_at else None
-        })
+            # orjson serializes datetime natively (ISO 8601)
+            "created_at": field.created_at,
+            "updated_at": field.updated_at
+        }
+        for field, doc_name in rows
+    ]
     
-    return {
-        "tender_id": str(tender_id),
+    return ORJSONResponse(content={
+        "tender_id": tender_id,
         "total_fields": len(provenance),
         "fields": provenance
-    }
+    })
@@ -0,0 +1,40 @@
+"""
+Shared API dependencies.
+
+Guards for endpoints that call DeepSeek.
+"""
+
+from functools import lru_cache
+from fastapi import Depends, HTTPException
+
+from app.config import settings
+from app.services.ai_throttle import deepseek_throttle
+
+
+@lru_cache()
+def _deepseek_configured() -> bool:
+    """API key presence is fixed for the life of the process."""
+    return bool(settings.deepseek_api_key)
+
+
+def require_deepseek() -> None:
+    """503 unless the DeepSeek API key is configured."""
+    if not _deepseek_configured():
+        raise HTTPException(
+            status_code=503,
+            detail="DeepSeek API key not configured. Set DEEPSEEK_API_KEY in .env"
+        )
+
+
+def ensure_ai_capacity() -> None:
+    """429 when the DeepSeek wait queue is full (shed load instead of blocking)."""
+    if deepseek_throttle.saturated:
+        raise HTTPException(
+            status_code=429,
+            detail="AI service is busy, retry shortly"
+        )
+
+
+def require_ai_capacity(_: None = Depends(require_deepseek)) -> None:
+    """DeepSeek configured and not saturated."""
+    ensure_ai_capacity()
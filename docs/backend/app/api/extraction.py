@@ -5,6 +5,7 @@ Triggers text extraction from documents.
 
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
@@ -13,7 +14,7 @@ from app.database import get_db
 from app.services.extraction_db import ExtractionDBService
 
 
-router = APIRouter(prefix="/extraction", tags=["extraction"])
+router = APIRouter()
 
 
 class ExtractionTrigger(BaseModel):
@@ -38,7 +39,7 @@ class ExtractionResult(BaseModel):
 
 
 @router.post("/trigger", response_model=ExtractionResponse)
-def trigger_extraction(
+async def trigger_extraction(
     request: ExtractionTrigger,
     db: Session = Depends(get_db)
 ):
@@ -51,7 +52,7 @@ def trigger_extraction(
     service = ExtractionDBService(db)
     
     if request.tender_id:
-        result = service.process_tender(request.tender_id)
+        result = await run_in_threadpool(service.process_tender, request.tender_id)
         
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
@@ -62,7 +63,7 @@ def trigger_extraction(
             tender_id=str(request.tender_id)
         )
     else:
-        result = service.process_pending_documents()
+        result = await run_in_threadpool(service.process_pending_documents)
         
         return ExtractionResponse(
             status="completed",
@@ -71,7 +72,7 @@ def trigger_extraction(
 
 
 @router.post("/tender/{tender_id}", response_model=ExtractionResult)
-def extract_tender_documents(
+async def extract_tender_documents(
     tender_id: UUID,
     db: Session = Depends(get_db)
 ):
@@ -81,7 +82,7 @@ def extract_tender_documents(
     Returns detailed extraction results.
     """
     service = ExtractionDBService(db)
-    result = service.process_tender(tender_id)
+    result = await run_in_threadpool(service.process_tender, tender_id)
     
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
@@ -90,7 +91,7 @@ def extract_tender_documents(
 
 
 @router.post("/pending")
-def process_pending_documents(
+async def process_pending_documents(
     limit: int = 50,
     db: Session = Depends(get_db)
 ):
@@ -101,7 +102,7 @@ def process_pending_documents(
         limit: Maximum number of documents to process
     """
     service = ExtractionDBService(db)
-    result = service.process_pending_documents(limit=limit)
+    result = await run_in_threadpool(service.process_pending_documents, limit=limit)
     
     return {
         "status": "completed",
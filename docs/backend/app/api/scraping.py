@@ -3,18 +3,20 @@ Scraping API endpoints.
 Manual trigger for tender scraping.
 """
 
-import asyncio
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from uuid import uuid4
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.services.scraper import TenderScraper, ScrapeResult, PLAYWRIGHT_AVAILABLE
+from app.config import settings
+from app.database import SessionLocal
+from app.services.scraper import TenderScraper, ScrapeResult, PLAYWRIGHT_AVAILABLE, browser_pool
 from app.services.scraper_db import ScraperDBService, document_store
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 # Request/Response schemas
@@ -36,19 +38,34 @@ class ScrapeResponse(BaseModel):
     errors: list[str]
     duration_seconds: float
     documents_in_memory: int
-    memory_usage_bytes: int
+    memory_usage_bytes: int  # stored (compressed) size
+    memory_uncompressed_bytes: int
 
 
 class ScrapeStatusResponse(BaseModel):
     playwright_available: bool
     scraper_ready: bool
     documents_in_memory: int
-    memory_usage_bytes: int
+    memory_usage_bytes: int  # stored (compressed) size
+    memory_uncompressed_bytes: int
+
+
+class ScrapeJobResponse(BaseModel):
+    job_id: str
+    status: str  # running | completed | failed
+    target_date: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[ScrapeResponse] = None
+    error: Optional[str] = None
 
 
 # Global scrape state (simple, for single-instance)
-_scrape_in_progress = False
+# Concurrent scrapes share the pooled browser, one context each
+_active_scrapes = 0
 _last_scrape_result: Optional[dict] = None
+_jobs: OrderedDict[str, dict] = OrderedDict()  # job_id -> ScrapeJobResponse fields
+_MAX_JOBS = 100
 
 
 @router.get("/status", response_model=ScrapeStatusResponse)
@@ -56,26 +73,30 @@ def get_scrape_status():
     """Check scraper status and readiness."""
     return ScrapeStatusResponse(
         playwright_available=PLAYWRIGHT_AVAILABLE,
-        scraper_ready=PLAYWRIGHT_AVAILABLE and not _scrape_in_progress,
+        scraper_ready=PLAYWRIGHT_AVAILABLE and _active_scrapes < settings.scrape_concurrency,
         documents_in_memory=document_store.count,
-        memory_usage_bytes=document_store.size
+        memory_usage_bytes=document_store.size,
+        memory_uncompressed_bytes=document_store.uncompressed_size
     )
 
 
-@router.post("/trigger", response_model=ScrapeResponse)
+@router.post("/trigger", response_model=ScrapeJobResponse, status_code=202)
 async def trigger_scrape(
     request: ScrapeRequest,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks
 ):
     """
     Manually trigger tender scraping.
     
+    Returns 202 with a job id immediately; the scrape runs in the
+    background. Poll `/jobs/{job_id}` (or `/last-result`) for the outcome.
+    
     - **target_date**: Date to scrape (YYYY-MM-DD), defaults to yesterday
     - **category**: Tender category (default: Fournitures)
     - **max_pages**: Maximum pagination pages to scrape
     - **headless**: Run browser in headless mode
     """
-    global _scrape_in_progress, _last_scrape_result
+    global _active_scrapes
     
     if not PLAYWRIGHT_AVAILABLE:
         raise HTTPException(
@@ -83,10 +104,10 @@ async def trigger_scrape(
             detail="Playwright not installed. Run: pip install playwright && playwright install chromium"
         )
     
-    if _scrape_in_progress:
+    if _active_scrapes >= settings.scrape_concurrency:
         raise HTTPException(
             status_code=409,
-            detail="Scrape already in progress"
+            detail="All scrape slots busy, retry later"
         )
     
     # Parse target date
@@ -101,11 +122,53 @@ async def trigger_scrape(
     else:
         target_date = datetime.now() - timedelta(days=1)
     
-    _scrape_in_progress = True
+    # Claim the slot now so concurrent triggers see it before the job starts
+    _active_scrapes += 1
     
+    job_id = str(uuid4())
+    job = {
+        "job_id": job_id,
+        "status": "running",
+        "target_date": target_date.strftime("%Y-%m-%d"),
+        "started_at": datetime.utcnow(),
+        "finished_at": None,
+        "result": None,
+        "error": None
+    }
+    _jobs[job_id] = job
+    _prune_jobs()
+    
+    background_tasks.add_task(_run_scrape_job, job, request, target_date)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ScrapeJobResponse)
+def get_scrape_job(job_id: str):
+    """Get state and result of a scrape job."""
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _prune_jobs():
+    """Keep at most _MAX_JOBS entries, dropping the oldest finished ones."""
+    for job_id in list(_jobs):
+        if len(_jobs) <= _MAX_JOBS:
+            break
+        if _jobs[job_id]["status"] != "running":
+            del _jobs[job_id]
+
+
+async def _run_scrape_job(job: dict, request: ScrapeRequest, target_date: datetime):
+    """Background body of trigger_scrape; owns its DB session."""
+    global _active_scrapes, _last_scrape_result
+    
+    db = SessionLocal()
     try:
         # Run scraper
-        scraper = TenderScraper(headless=request.headless)
+        browser = await browser_pool.get_browser(headless=request.headless)
+        scraper = TenderScraper(browser=browser)
         result: ScrapeResult = await scraper.scrape(
             target_date=target_date,
             category=request.category,
@@ -113,9 +176,11 @@ async def trigger_scrape(
         )
         
         # Store documents in memory
-        for tender in result.tenders:
-            for doc in tender.documents:
-                document_store.store(tender.reference, doc.filename, doc.content)
+        document_store.store_many(
+            (tender.reference, doc.filename, doc.content)
+            for tender in result.tenders
+            for doc in tender.documents
+        )
         
         # Save to database
         db_service = ScraperDBService(db)
@@ -133,14 +198,20 @@ async def trigger_scrape(
             errors=result.errors + db_result["errors"],
             duration_seconds=result.duration_seconds,
             documents_in_memory=document_store.count,
-            memory_usage_bytes=document_store.size
+            memory_usage_bytes=document_store.size,
+            memory_uncompressed_bytes=document_store.uncompressed_size
         )
         
         _last_scrape_result = response.model_dump()
-        return response
-        
+        job["result"] = _last_scrape_result
+        job["status"] = "completed"
+    except Exception as e:
+        job["error"] = str(e)
+        job["status"] = "failed"
     finally:
-        _scrape_in_progress = False
+        job["finished_at"] = datetime.utcnow()
+        _active_scrapes -= 1
+        db.close()
 
 
 @router.get("/last-result")
@@ -170,12 +241,12 @@ def clear_document_memory():
 @router.get("/documents/{reference}")
 def get_tender_documents_in_memory(reference: str):
     """Get list of documents in memory for a tender."""
-    docs = document_store.get_all_for_tender(reference)
+    docs = document_store.list_tender_documents(reference)
     return {
         "reference": reference,
         "documents": [
-            {"filename": name, "size": len(content)}
-            for name, content in docs.items()
+            {"filename": name, "size": size}
+            for name, size in docs
         ],
-        "total_size": sum(len(c) for c in docs.values())
+        "total_size": sum(size for _, size in docs)
     }
@@ -1,11 +1,14 @@
+import base64
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
+from sqlalchemy import or_, func, tuple_, exists
 
 from app.database import get_db
-from app.models import Tender, TenderStatus
+from app.models import Tender, TenderDocument, TenderField, TenderStatus
 from app.schemas import (
     TenderResponse,
     TenderDetailResponse,
@@ -15,7 +18,10 @@ from app.schemas import (
     PaginatedResponse
 )
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# TenderField names that feed TenderAnalysis
+ANALYSIS_FIELD_NAMES = ("summary", "key_requirement", "eligibility_criteria", "submission_requirement")
 
 
 @router.get("", response_model=PaginatedResponse[TenderResponse])
@@ -25,9 +31,15 @@ def list_tenders(
     category: Optional[str] = Query(None, description="Filter by category"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor (overrides page)"),
     db: Session = Depends(get_db)
 ):
-    """List tenders with filtering and pagination."""
+    """
+    List tenders with filtering and pagination.
+    
+    Prefer `cursor` for deep pages: it seeks on (created_at, id) instead
+    of scanning and discarding OFFSET rows.
+    """
     query = db.query(Tender)
     
     # Search filter
@@ -53,48 +65,92 @@ def list_tenders(
     if category:
         query = query.filter(Tender.category.ilike(f"%{category}%"))
     
-    # Get total count
-    total = query.count()
+    # Get total count (plain COUNT over the filtered rows, no subquery)
+    total = query.with_entities(func.count(Tender.id)).order_by(None).scalar()
     
-    # Pagination
-    offset = (page - 1) * page_size
-    tenders = query.order_by(Tender.created_at.desc()).offset(offset).limit(page_size).all()
+    # Pagination (only the columns TenderResponse needs)
+    page_query = query.order_by(Tender.created_at.desc(), Tender.id.desc())
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        page_query = page_query.filter(
+            tuple_(Tender.created_at, Tender.id) < (cursor_created_at, cursor_id)
+        )
+    else:
+        page_query = page_query.offset((page - 1) * page_size)
+    
+    tenders = page_query.options(
+        load_only(
+            Tender.id,
+            Tender.reference,
+            Tender.title,
+            Tender.organization,
+            Tender.category,
+            Tender.deadline,
+            Tender.budget_estimate,
+            Tender.status,
+            Tender.source_url,
+            Tender.created_at,
+            Tender.updated_at
+        )
+    ).limit(page_size).all()
     
     # Calculate total pages
     total_pages = (total + page_size - 1) // page_size
     
     return PaginatedResponse(
-        items=[TenderResponse.from_orm_with_budget(t) for t in tenders],
+        items=[TenderResponse.model_validate(t) for t in tenders],
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=_encode_cursor(tenders[-1]) if len(tenders) == page_size else None
     )
 
 
+def _encode_cursor(tender: Tender) -> str:
+    """Opaque keyset cursor for the last row of a page."""
+    raw = f"{tender.created_at.isoformat()}|{tender.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Inverse of _encode_cursor; 400 on malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, tender_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(tender_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/{tender_id}", response_model=TenderDetailResponse)
 def get_tender(
     tender_id: UUID,
     db: Session = Depends(get_db)
 ):
     """Get detailed tender information."""
+    # Collections via selectin (one query each) instead of a D x F join product
     tender = db.query(Tender).options(
-        joinedload(Tender.documents),
-        joinedload(Tender.fields),
+        selectinload(Tender.documents),
         joinedload(Tender.processing_state)
     ).filter(Tender.id == tender_id).first()
     
     if not tender:
         raise HTTPException(status_code=404, detail="Tender not found")
     
-    # Build analysis from fields
+    # Build analysis from fields (only the ones it uses; skip large AI blobs)
     analysis = None
-    if tender.fields:
+    has_fields = db.query(
+        exists().where(TenderField.tender_id == tender_id)
+    ).scalar()
+    if has_fields:
         field_map = {}
-        for field in tender.fields:
-            if field.field_name not in field_map:
-                field_map[field.field_name] = []
-            field_map[field.field_name].append(field.field_value)
+        rows = db.query(TenderField.field_name, TenderField.field_value).filter(
+            TenderField.tender_id == tender_id,
+            TenderField.field_name.in_(ANALYSIS_FIELD_NAMES)
+        ).all()
+        for field_name, field_value in rows:
+            field_map.setdefault(field_name, []).append(field_value)
         
         analysis = TenderAnalysis(
             summary=field_map.get("summary", [None])[0],
@@ -103,12 +159,13 @@ def get_tender(
             submission_requirements=field_map.get("submission_requirement", [])
         )
     
-    # Get extracted text from documents
-    extracted_text = None
-    for doc in tender.documents:
-        if doc.extracted_text:
-            extracted_text = doc.extracted_text
-            break
+    # Extracted text of the first document that has any (the column is
+    # deferred, so the collection above never loaded it)
+    extracted_text = db.query(TenderDocument.extracted_text).filter(
+        TenderDocument.tender_id == tender_id,
+        TenderDocument.extracted_text.isnot(None),
+        TenderDocument.extracted_text != ""
+    ).order_by(TenderDocument.created_at).limit(1).scalar()
     
     return TenderDetailResponse(
         id=tender.id,
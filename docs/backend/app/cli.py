@@ -17,36 +17,79 @@ Usage:
 
 import argparse
 import asyncio
+import atexit
+import importlib.util
 import sys
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from typing import Optional
 from uuid import UUID
 
-from app.services.scraper import run_scraper, PLAYWRIGHT_AVAILABLE
-from app.services.scraper_db import ScraperDBService, document_store
-from app.services.extraction_db import ExtractionDBService
-from app.services.ai_db import AIDBService
-from app.services.deep_analysis_db import DeepAnalysisDBService
-from app.services.ask_ai_db import AskAIDBService
-from app.database import SessionLocal
+# Service and database imports live inside each command so a command only
+# pays for the modules it uses (Playwright, OCR, AI clients, the engine).
+
+# One event loop per process: the pooled browser and the AI HTTP client are
+# bound to the loop that created them, so reusing it keeps them warm across
+# commands run from the same process (interactive ask, scripted pipelines).
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro):
+    """Run a coroutine on the CLI's persistent event loop."""
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        atexit.register(_close_loop)
+    return _loop.run_until_complete(coro)
+
+
+def _close_loop():
+    """Release the pooled browser and AI client, then close the loop."""
+    # Only what a command actually imported can hold resources
+    ai_client = sys.modules.get("app.services.ai_client")
+    if ai_client is not None:
+        _loop.run_until_complete(ai_client.close_ai_client())
+    scraper = sys.modules.get("app.services.scraper")
+    if scraper is not None:
+        _loop.run_until_complete(scraper.browser_pool.close())
+    _loop.close()
+
+
+# Tenders per DB transaction when `scrape --save` streams results
+SCRAPE_SAVE_BATCH = 500
+
+
+# Optional extraction dependencies: display name -> module
+EXTRACTION_DEPS = {
+    "PyMuPDF (PDF)": "fitz",
+    "python-docx (DOCX)": "docx",
+    "openpyxl (XLSX)": "openpyxl",
+    "xlrd (XLS)": "xlrd",
+    "PaddleOCR": "paddleocr",
+    "httpx (HTTP)": "httpx",
+}
 
 
 def cmd_scrape(args):
     """Run scraper command."""
+    from app.services.scraper import iter_scraper, PLAYWRIGHT_AVAILABLE
+    from app.services.scraper_db import ScraperDBService, document_store
+    
     if not PLAYWRIGHT_AVAILABLE:
         print("ERROR: Playwright not installed.")
         print("Run: pip install playwright && playwright install chromium")
         sys.exit(1)
     
-    # Determine target date
+    # Determine target date (--yesterday is the default)
     if args.date:
         try:
-            target_date = datetime.strptime(args.date, "%Y-%m-%d")
+            day = date.fromisoformat(args.date)
+            if day.isoformat() != args.date:
+                raise ValueError(args.date)  # 3.11+ also accepts 20240105, 2024-W01-5
+            target_date = datetime.combine(day, time())
         except ValueError:
             print(f"ERROR: Invalid date format: {args.date}")
             print("Use YYYY-MM-DD format")
             sys.exit(1)
-    elif args.yesterday:
-        target_date = datetime.now() - timedelta(days=1)
     else:
         target_date = datetime.now() - timedelta(days=1)
     
@@ -55,56 +98,94 @@ def cmd_scrape(args):
     print(f"Headless: {not args.visible}")
     print("-" * 40)
     
-    # Run scraper
-    result = asyncio.run(run_scraper(
-        target_date=target_date,
-        headless=not args.visible
-    ))
+    if args.save:
+        print(f"Saving to database every {SCRAPE_SAVE_BATCH} tenders")
+    else:
+        print("Skipping database save (use --save to persist)")
     
-    print(f"\nScrape completed in {result.duration_seconds:.2f}s")
-    print(f"Tenders found: {len(result.tenders)}")
+    # Stream tenders: store documents, save in batches, keep only counters
+    errors: list[str] = []
+    db_totals = {"created": 0, "updated": 0, "skipped": 0, "errors": 0}
+    preview: list[tuple[str, str]] = []  # (reference, title) of the first 10
+    found = 0
     
-    if result.errors:
-        print(f"\nErrors ({len(result.errors)}):")
-        for err in result.errors:
-            print(f"  - {err}")
+    db = None
+    if args.save:
+        from app.database import SessionLocal
+        db = SessionLocal()
     
-    # Store in memory
-    for tender in result.tenders:
-        for doc in tender.documents:
-            document_store.store(tender.reference, doc.filename, doc.content)
+    def save_batch(batch):
+        db_result = ScraperDBService(db).save_tenders(batch)
+        for key in ("created", "updated", "skipped"):
+            db_totals[key] += db_result[key]
+        db_totals["errors"] += len(db_result["errors"])
+        batch.clear()
+    
+    async def scrape():
+        nonlocal found
+        batch = []
+        async for tender in iter_scraper(
+            target_date=target_date,
+            category=args.category,
+            headless=not args.visible,
+            errors=errors
+        ):
+            found += 1
+            if len(preview) < 10:
+                preview.append((tender.reference, tender.title))
+            document_store.store_many(
+                (tender.reference, doc.filename, doc.content)
+                for doc in tender.documents
+            )
+            if db is not None:
+                batch.append(tender)
+                if len(batch) >= SCRAPE_SAVE_BATCH:
+                    save_batch(batch)
+        if db is not None and batch:
+            save_batch(batch)
+    
+    start_time = datetime.now()
+    try:
+        run_async(scrape())
+    finally:
+        if db is not None:
+            db.close()
+    duration = (datetime.now() - start_time).total_seconds()
+    
+    print(f"\nScrape completed in {duration:.2f}s")
+    print(f"Tenders found: {found}")
+    
+    if errors:
+        print(f"\nErrors ({len(errors)}):")
+        print("\n".join(f"  - {err}" for err in errors))
     
     print(f"\nDocuments in memory: {document_store.count}")
-    print(f"Memory usage: {document_store.size / 1024 / 1024:.2f} MB")
+    print(f"Memory usage: {document_store.size / 1024 / 1024:.2f} MB "
+          f"({document_store.uncompressed_size / 1024 / 1024:.2f} MB uncompressed)")
     
-    # Save to database
     if args.save:
-        print("\nSaving to database...")
-        db = SessionLocal()
-        try:
-            db_service = ScraperDBService(db)
-            db_result = db_service.save_scrape_result(result)
-            print(f"  Created: {db_result['created']}")
-            print(f"  Updated: {db_result['updated']}")
-            print(f"  Skipped: {db_result['skipped']}")
-            if db_result['errors']:
-                print(f"  DB Errors: {len(db_result['errors'])}")
-        finally:
-            db.close()
-    else:
-        print("\nSkipping database save (use --save to persist)")
+        print("\nSaved to database:")
+        print(f"  Created: {db_totals['created']}")
+        print(f"  Updated: {db_totals['updated']}")
+        print(f"  Skipped: {db_totals['skipped']}")
+        if db_totals['errors']:
+            print(f"  DB Errors: {db_totals['errors']}")
     
     # Summary
     print("\n" + "=" * 40)
     print("Scraped tenders:")
-    for tender in result.tenders[:10]:  # Show first 10
-        print(f"  [{tender.reference}] {tender.title[:50]}...")
-    if len(result.tenders) > 10:
-        print(f"  ... and {len(result.tenders) - 10} more")
+    if preview:
+        # First 10, written in one call
+        print("\n".join(f"  [{reference}] {title[:50]}..." for reference, title in preview))
+    if found > 10:
+        print(f"  ... and {found - 10} more")
 
 
 def cmd_extract(args):
     """Run text extraction command."""
+    from app.database import SessionLocal
+    from app.services.extraction_db import ExtractionDBService
+    
     print("Text Extraction Pipeline")
     print("=" * 40)
     
@@ -141,7 +222,7 @@ def cmd_extract(args):
         
         elif args.pending:
             print(f"Processing pending documents (limit: {args.limit})")
-            result = service.process_pending_documents(limit=args.limit)
+            result = service.process_pending_documents(limit=args.limit, max_workers=args.workers)
             
             print(f"\nProcessed: {result['total']} documents")
             print(f"  Successful: {result['success']}")
@@ -157,6 +238,9 @@ def cmd_extract(args):
 
 def cmd_analyze(args):
     """Run AI analysis command."""
+    from app.database import SessionLocal
+    from app.services.ai_db import AIDBService
+    
     print("AI Analysis Pipeline (DeepSeek)")
     print("=" * 40)
     
@@ -177,7 +261,7 @@ def cmd_analyze(args):
                 sys.exit(1)
             
             print(f"Analyzing tender: {tender_id}")
-            result = asyncio.run(service.analyze_tender(tender_id))
+            result = run_async(service.analyze_tender(tender_id))
             
             if "error" in result:
                 print(f"ERROR: {result['error']}")
@@ -194,7 +278,7 @@ def cmd_analyze(args):
         
         elif args.pending:
             print(f"Analyzing pending tenders (limit: {args.limit})")
-            result = asyncio.run(service.analyze_pending_tenders(limit=args.limit))
+            result = run_async(service.analyze_pending_tenders(limit=args.limit))
             
             print(f"\nResults:")
             print(f"  Total pending: {result['total_pending']}")
@@ -217,6 +301,9 @@ def cmd_analyze(args):
 
 def cmd_deep_analyze(args):
     """Run deep analysis command (on-demand)."""
+    from app.database import SessionLocal
+    from app.services.deep_analysis_db import DeepAnalysisDBService
+    
     print("Deep Analysis Pipeline (DeepSeek)")
     print("=" * 40)
     print("Note: Deep analysis is normally triggered on-demand when user opens a tender.")
@@ -254,7 +341,7 @@ def cmd_deep_analyze(args):
                 return
         
         print(f"Running deep analysis for: {tender_id}")
-        result = asyncio.run(service.perform_deep_analysis(tender_id))
+        result = run_async(service.perform_deep_analysis(tender_id, force=args.force))
         
         if "error" in result:
             print(f"ERROR: {result['error']}")
@@ -288,6 +375,9 @@ def cmd_deep_analyze(args):
 
 def cmd_ask(args):
     """Ask a question about a tender."""
+    from app.database import SessionLocal
+    from app.services.ask_ai_db import AskAIDBService
+    
     print("Ask AI - Tender Q&A")
     print("=" * 40)
     
@@ -339,7 +429,7 @@ def cmd_ask(args):
                 if not question or question.lower() in ['quit', 'exit', 'q']:
                     break
                 
-                result = asyncio.run(service.ask_about_tender(
+                result = run_async(service.ask_about_tender(
                     tender_id=tender_id,
                     question=question,
                     conversation_history=conversation_history
@@ -374,7 +464,7 @@ def cmd_ask(args):
             print(f"Question: {question}")
             print("")
             
-            result = asyncio.run(service.ask_about_tender(
+            result = run_async(service.ask_about_tender(
                 tender_id=tender_id,
                 question=question
             ))
@@ -407,32 +497,26 @@ def cmd_ask(args):
 
 def cmd_status(args):
     """Show platform status."""
+    from app.services.scraper import PLAYWRIGHT_AVAILABLE
+    from app.services.scraper_db import document_store
+    
     print("Tender AI Platform Status")
     print("=" * 40)
     print(f"Playwright available: {PLAYWRIGHT_AVAILABLE}")
     print(f"Documents in memory: {document_store.count}")
-    print(f"Memory usage: {document_store.size / 1024 / 1024:.2f} MB")
-    
-    # Check extraction dependencies
-    deps = {
-        "PyMuPDF (PDF)": "fitz",
-        "python-docx (DOCX)": "docx",
-        "openpyxl (XLSX)": "openpyxl",
-        "xlrd (XLS)": "xlrd",
-        "PaddleOCR": "paddleocr",
-        "httpx (HTTP)": "httpx",
-    }
+    print(f"Memory usage: {document_store.size / 1024 / 1024:.2f} MB "
+          f"({document_store.uncompressed_size / 1024 / 1024:.2f} MB uncompressed)")
     
+    # Check extraction dependencies (find_spec locates without importing)
     print("\nExtraction dependencies:")
-    for name, module in deps.items():
-        try:
-            __import__(module)
-            print(f"  ✓ {name}")
-        except ImportError:
-            print(f"  ✗ {name} (not installed)")
+    print("\n".join(
+        f"  ✓ {name}" if importlib.util.find_spec(module) is not None else f"  ✗ {name} (not installed)"
+        for name, module in EXTRACTION_DEPS.items()
+    ))
     
     # Check AI configuration
-    from app.config import settings
+    from app.config import get_settings
+    settings = get_settings()
     print("\nAI Features:")
     if settings.deepseek_api_key:
         print(f"  ✓ DeepSeek API configured")
@@ -445,109 +529,137 @@ def cmd_status(args):
         print("    Set DEEPSEEK_API_KEY in .env")
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Tender AI Platform CLI",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    subparsers = parser.add_subparsers(dest="command", help="Commands")
-    
-    # Scrape command
-    scrape_parser = subparsers.add_parser("scrape", help="Run tender scraper")
-    scrape_parser.add_argument(
+def _add_scrape_args(parser):
+    parser.add_argument(
         "--date", "-d",
         help="Target date (YYYY-MM-DD)"
     )
-    scrape_parser.add_argument(
+    parser.add_argument(
         "--yesterday", "-y",
         action="store_true",
         help="Scrape yesterday's tenders (default)"
     )
-    scrape_parser.add_argument(
+    parser.add_argument(
         "--category", "-c",
         default="Fournitures",
         help="Tender category (default: Fournitures)"
     )
-    scrape_parser.add_argument(
+    parser.add_argument(
         "--visible", "-v",
         action="store_true",
         help="Show browser window (non-headless)"
     )
-    scrape_parser.add_argument(
+    parser.add_argument(
         "--save", "-s",
         action="store_true",
         help="Save results to database"
     )
-    scrape_parser.set_defaults(func=cmd_scrape)
-    
-    # Extract command
-    extract_parser = subparsers.add_parser("extract", help="Extract text from documents")
-    extract_parser.add_argument(
+
+
+def _add_extract_args(parser):
+    parser.add_argument(
         "--tender-id", "-t",
         help="Tender UUID to process"
     )
-    extract_parser.add_argument(
+    parser.add_argument(
         "--pending", "-p",
         action="store_true",
         help="Process all pending documents"
     )
-    extract_parser.add_argument(
+    parser.add_argument(
         "--limit", "-l",
         type=int,
         default=50,
         help="Max documents to process (default: 50)"
     )
-    extract_parser.set_defaults(func=cmd_extract)
-    
-    # Analyze command
-    analyze_parser = subparsers.add_parser("analyze", help="Run AI analysis (Avis)")
-    analyze_parser.add_argument(
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=1,
+        help="Extraction processes for --pending (default: 1; each loads its own OCR model)"
+    )
+
+
+def _add_analyze_args(parser):
+    parser.add_argument(
         "--tender-id", "-t",
         help="Tender UUID to analyze"
     )
-    analyze_parser.add_argument(
+    parser.add_argument(
         "--pending", "-p",
         action="store_true",
         help="Analyze all pending tenders"
     )
-    analyze_parser.add_argument(
+    parser.add_argument(
         "--limit", "-l",
         type=int,
         default=10,
         help="Max tenders to analyze (default: 10)"
     )
-    analyze_parser.set_defaults(func=cmd_analyze)
-    
-    # Deep Analyze command
-    deep_analyze_parser = subparsers.add_parser("deep-analyze", help="Run deep analysis (on-demand)")
-    deep_analyze_parser.add_argument(
+
+
+def _add_deep_analyze_args(parser):
+    parser.add_argument(
         "--tender-id", "-t",
         required=True,
         help="Tender UUID to deep analyze"
     )
-    deep_analyze_parser.add_argument(
+    parser.add_argument(
         "--force", "-f",
         action="store_true",
         help="Force re-analysis even if already analyzed"
     )
-    deep_analyze_parser.set_defaults(func=cmd_deep_analyze)
-    
-    # Ask AI command
-    ask_parser = subparsers.add_parser("ask", help="Ask questions about a tender")
-    ask_parser.add_argument(
+
+
+def _add_ask_args(parser):
+    parser.add_argument(
         "--tender-id", "-t",
         required=True,
         help="Tender UUID to ask about"
     )
-    ask_parser.add_argument(
+    parser.add_argument(
         "--question", "-q",
         help="Question to ask (omit for interactive mode)"
     )
-    ask_parser.set_defaults(func=cmd_ask)
+
+
+def _add_no_args(parser):
+    pass
+
+
+# Subcommand -> (help, argument builder, handler)
+COMMANDS = {
+    "scrape": ("Run tender scraper", _add_scrape_args, cmd_scrape),
+    "extract": ("Extract text from documents", _add_extract_args, cmd_extract),
+    "analyze": ("Run AI analysis (Avis)", _add_analyze_args, cmd_analyze),
+    "deep-analyze": ("Run deep analysis (on-demand)", _add_deep_analyze_args, cmd_deep_analyze),
+    "ask": ("Ask questions about a tender", _add_ask_args, cmd_ask),
+    "status": ("Show platform status", _add_no_args, cmd_status),
+}
+
+
+def _sniff_subcommand(argv: list[str]) -> Optional[str]:
+    """First positional token, i.e. the subcommand (no top-level option takes a value)."""
+    for token in argv:
+        if not token.startswith("-"):
+            return token
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tender AI Platform CLI",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
     
-    # Status command
-    status_parser = subparsers.add_parser("status", help="Show platform status")
-    status_parser.set_defaults(func=cmd_status)
+    # Every command is listed, but only the selected one gets its arguments
+    selected = _sniff_subcommand(sys.argv[1:])
+    for name, (help_text, add_args, func) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name, help=help_text)
+        command_parser.set_defaults(func=func)
+        if name == selected:
+            add_args(command_parser)
     
     args = parser.parse_args()
     
@@ -1,12 +1,27 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.config import settings
 
+# psycopg2 fast paths: INSERTs already batch via insertmanyvalues; this also
+# pages executemany UPDATE/DELETE (bulk updates by primary key) through
+# execute_batch instead of one round trip per row
+_driver_options = {}
+if make_url(settings.database_url).get_driver_name() == "psycopg2":
+    _driver_options = {
+        "executemany_mode": "values_plus_batch",
+        "executemany_batch_page_size": settings.db_insert_page_size,
+    }
+
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    insertmanyvalues_page_size=settings.db_insert_page_size,
+    **_driver_options
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,3 +36,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+T = TypeVar("T")
+
+
+async def run_with_session(work: Callable[[Session], Awaitable[T]]) -> T:
+    """
+    Run `work` on a session it owns, closed when it finishes.
+    
+    For shared (coalesced) tasks: they can outlive the request that
+    started them, so they must not borrow that request's get_db session.
+    """
+    db = SessionLocal()
+    try:
+        return await work(db)
+    finally:
+        db.close()
@@ -1,40 +1,79 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
-from app.api import api_router
-
-app = FastAPI(
-    title="Tender AI Platform",
-    description="Backend API for Tender AI Platform - V1",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Routes
-app.include_router(api_router, prefix=settings.api_prefix)
-
-
-@app.get("/health")
-def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "version": "1.0.0"}
-
-
-@app.get("/")
-def root():
-    """Root endpoint."""
-    return {
-        "message": "Tender AI Platform API",
-        "docs": "/docs",
-        "health": "/health"
-    }
+from app.config import get_settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the OpenAPI schema at startup; release shared clients/browsers on shutdown."""
+    app.openapi()  # cached on app.openapi_schema, so /docs never pays for it
+    yield
+    from app.services.ai_client import close_ai_client
+    from app.services.scraper import browser_pool
+
+    await close_ai_client()
+    await browser_pool.close()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application.
+
+    Routers (and with them every service, schema and model) are imported
+    here rather than at module import, so `uvicorn app.main:create_app
+    --factory` only pays for them once, when the app is actually built.
+    """
+    from app.api import api_router
+
+    settings = get_settings()
+
+    app = FastAPI(
+        title="Tender AI Platform",
+        description="Backend API for Tender AI Platform - V1",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan
+    )
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Routes
+    app.include_router(api_router, prefix=settings.api_prefix)
+
+    @app.get("/health")
+    def health_check():
+        """Health check endpoint."""
+        return {"status": "healthy", "version": "1.0.0"}
+
+    @app.get("/")
+    def root():
+        """Root endpoint."""
+        return {
+            "message": "Tender AI Platform API",
+            "docs": "/docs",
+            "health": "/health"
+        }
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` keeps working: the app is built on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,18 @@
 import enum
-from datetime import datetime
 from uuid import uuid4
 from sqlalchemy import (
     Column, String, Text, DateTime, Enum, ForeignKey, 
-    Integer, Float, Boolean, Index
+    Integer, Float, Boolean, Index, text, func
 )
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, query_expression
 from app.database import Base
 
 
+# Server-side timestamp: naive UTC, matching the former datetime.utcnow() default
+UTC_NOW = func.timezone("utc", func.now())
+
+
 class TenderStatus(str, enum.Enum):
     OPEN = "open"
     CLOSED = "closed"
@@ -75,8 +78,8 @@ class Tender(Base):
     source_id = Column(String(100), nullable=True)  # ID from source website
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
+    updated_at = Column(DateTime, server_default=UTC_NOW, onupdate=UTC_NOW, nullable=False)
     
     # Relationships
     documents = relationship("TenderDocument", back_populates="tender", cascade="all, delete-orphan")
@@ -86,6 +89,12 @@ class Tender(Base):
     __table_args__ = (
         Index("ix_tenders_status_deadline", "status", "deadline"),
         Index("ix_tenders_organization", "organization"),
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_tenders_created_at_id", created_at.desc(), id.desc()),
+        # ILIKE '%term%' search (requires the pg_trgm extension)
+        Index("ix_tenders_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_tenders_reference_trgm", "reference", postgresql_using="gin", postgresql_ops={"reference": "gin_trgm_ops"}),
+        Index("ix_tenders_organization_trgm", "organization", postgresql_using="gin", postgresql_ops={"organization": "gin_trgm_ops"}),
     )
 
 
@@ -106,12 +115,13 @@ class TenderDocument(Base):
     # OCR
     ocr_status = Column(Enum(OCRStatus), default=OCRStatus.PENDING)
     ocr_error = Column(Text, nullable=True)
-    extracted_text = Column(Text, nullable=True)
+    extracted_text = deferred(Column(Text, nullable=True))  # large; load with undefer() where needed
+    extracted_text_head = query_expression()  # prefix of extracted_text, set via with_expression()
     page_count = Column(Integer, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
+    updated_at = Column(DateTime, server_default=UTC_NOW, onupdate=UTC_NOW, nullable=False)
     
     # Relationships
     tender = relationship("Tender", back_populates="documents")
@@ -119,6 +129,8 @@ class TenderDocument(Base):
     __table_args__ = (
         Index("ix_tender_documents_tender_id", "tender_id"),
         Index("ix_tender_documents_ocr_status", "ocr_status"),
+        # Extraction queue: pending documents, oldest first (enum stored by name)
+        Index("ix_tender_documents_pending_queue", "created_at", postgresql_where=text("ocr_status = 'PENDING'")),
     )
 
 
@@ -145,14 +157,14 @@ class TenderField(Base):
     verified_at = Column(DateTime, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
+    updated_at = Column(DateTime, server_default=UTC_NOW, onupdate=UTC_NOW, nullable=False)
     
     # Relationships
     tender = relationship("Tender", back_populates="fields")
 
     __table_args__ = (
-        Index("ix_tender_fields_tender_id_field_name", "tender_id", "field_name"),
+        Index("ix_tender_fields_tender_id_field_name", "tender_id", "field_name", unique=True),  # upsert target
         Index("ix_tender_fields_source", "source"),
     )
 
@@ -183,8 +195,8 @@ class ProcessingState(Base):
     analysis_completed_at = Column(DateTime, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
+    updated_at = Column(DateTime, server_default=UTC_NOW, onupdate=UTC_NOW, nullable=False)
     
     # Relationships
     tender = relationship("Tender", back_populates="processing_state")
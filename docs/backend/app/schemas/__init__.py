@@ -8,6 +8,7 @@ from app.schemas.tender import (
     TenderDocumentResponse,
     TenderFieldResponse,
     ProcessingStateResponse,
+    TenderAnalysis,
     PaginatedResponse
 )
 
@@ -21,5 +22,6 @@ __all__ = [
     "TenderDocumentResponse",
     "TenderFieldResponse",
     "ProcessingStateResponse",
+    "TenderAnalysis",
     "PaginatedResponse"
 ]
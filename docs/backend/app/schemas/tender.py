@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, Generic, TypeVar
 from uuid import UUID
-from pydantic import BaseModel, ConfigDict
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from app.models.tender import TenderStatus, DocumentType, OCRStatus, ProcessingStatus, FieldSource
 
 T = TypeVar("T")
@@ -14,6 +14,7 @@ class PaginatedResponse(BaseModel, Generic[T]):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page
 
 
 # Tender Schemas
@@ -53,28 +54,13 @@ class TenderResponse(BaseModel):
     organization: str
     category: str
     deadline: Optional[datetime]
-    budget: Optional[float] = None  # Alias for budget_estimate
+    # Read from Tender.budget_estimate; still accepted (and serialized) as "budget"
+    budget: Optional[float] = Field(default=None, validation_alias=AliasChoices("budget", "budget_estimate"))
     status: TenderStatus
     source_url: str
     created_at: datetime
     updated_at: datetime
 
-    @classmethod
-    def from_orm_with_budget(cls, tender):
-        return cls(
-            id=tender.id,
-            reference=tender.reference,
-            title=tender.title,
-            organization=tender.organization,
-            category=tender.category,
-            deadline=tender.deadline,
-            budget=tender.budget_estimate,
-            status=tender.status,
-            source_url=tender.source_url,
-            created_at=tender.created_at,
-            updated_at=tender.updated_at
-        )
-
 
 class TenderListResponse(TenderResponse):
     """Tender response for list views (same as TenderResponse)."""
@@ -90,7 +76,6 @@ class TenderDocumentResponse(BaseModel):
     file_type: DocumentType
     file_size: Optional[int]
     ocr_status: OCRStatus
-    extracted_text: Optional[str]
     download_url: Optional[str]
     page_count: Optional[int]
 
@@ -5,13 +5,21 @@ Night Shift — minimal cost, immediate listing.
 Extract searchable listing metadata with zero inference and full traceability.
 """
 
-import json
-import httpx
-from dataclasses import dataclass, field, asdict
+import asyncio
+import re
+from dataclasses import dataclass, field
 from typing import Optional, Any
 from enum import Enum
 
+import orjson
+
 from app.config import settings
+from app.services.ai_client import chat_completion
+from app.services.tokens import truncate_tokens
+
+
+# Per-document prompt budget, in tokens (~30k characters of French text)
+DOCUMENT_TOKEN_BUDGET = 7_500
 
 
 class DocumentType(str, Enum):
@@ -49,8 +57,23 @@ DOCUMENT_DETECTION_KEYWORDS = {
     ]
 }
 
+# One case-insensitive alternation per type, tried in the priority order above
+DOCUMENT_DETECTION_PATTERNS = [
+    (doc_type, re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE))
+    for doc_type, keywords in DOCUMENT_DETECTION_KEYWORDS.items()
+]
 
-@dataclass
+
+def detect_document_type(first_page_text: str) -> DocumentType:
+    """First type (in priority order) with a keyword on the page."""
+    for doc_type, pattern in DOCUMENT_DETECTION_PATTERNS:
+        if pattern.search(first_page_text):
+            return doc_type
+    
+    return DocumentType.UNKNOWN
+
+
+@dataclass(slots=True)
 class ProvenanceField:
     """Field with provenance tracking."""
     value: Optional[str] = None
@@ -58,14 +81,14 @@ class ProvenanceField:
     source_date: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class SubmissionDeadline:
     """Submission deadline with date and time."""
     date: ProvenanceField = field(default_factory=ProvenanceField)
     time: ProvenanceField = field(default_factory=ProvenanceField)
 
 
-@dataclass
+@dataclass(slots=True)
 class LotMetadata:
     """Lot metadata from Avis."""
     lot_number: Optional[str] = None
@@ -74,7 +97,7 @@ class LotMetadata:
     caution_provisoire: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Keywords:
     """Multilingual keywords for search."""
     keywords_fr: list[str] = field(default_factory=list)
@@ -82,7 +105,7 @@ class Keywords:
     keywords_ar: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AvisMetadata:
     """
     AVIS METADATA EXTRACTION SCHEMA.
@@ -101,6 +124,14 @@ class AvisMetadata:
     keywords: Keywords = field(default_factory=Keywords)
 
 
+def _provenance_dict(prov: ProvenanceField) -> dict:
+    return {
+        "value": prov.value,
+        "source_document": prov.source_document,
+        "source_date": prov.source_date,
+    }
+
+
 # Avis Extraction Prompt
 AVIS_EXTRACTION_PROMPT = """Tu es un moteur d'extraction juridique et technique.
 Tu n'es PAS un rédacteur. Tu n'es PAS un résumeur.
@@ -229,14 +260,7 @@ class AvisExtractor:
         Classify document by content keywords (not filename).
         Scans first page only.
         """
-        text_lower = first_page_text.lower()
-        
-        for doc_type, keywords in DOCUMENT_DETECTION_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return doc_type
-        
-        return DocumentType.UNKNOWN
+        return detect_document_type(first_page_text)
     
     def sort_annexes_chronologically(self, documents: list[dict]) -> list[dict]:
         """
@@ -249,6 +273,11 @@ class AvisExtractor:
         # Sort by date if available, otherwise by position
         annexes.sort(key=lambda x: x.get("date") or x.get("position", 0))
         
+        # Fixed order for the rest: the same documents always build the same
+        # prompt (exact cache hits, DeepSeek prefix cache), and a new annex
+        # only changes the tail
+        others.sort(key=lambda x: x.get("filename", ""))
+        
         return others + annexes  # Annexes last = override
     
     async def extract_metadata(
@@ -285,46 +314,30 @@ class AvisExtractor:
                 f"\n{'='*60}\n"
                 f"[{doc_type_label}] {doc['filename']}\n"
                 f"{'='*60}\n"
-                f"{doc['content'][:30000]}"  # Limit per document
+                f"{truncate_tokens(doc['content'], DOCUMENT_TOKEN_BUDGET)}"  # Limit per document
             )
         
         combined_text = "\n\n".join(doc_texts)
         
         # Call DeepSeek API
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": AVIS_EXTRACTION_PROMPT},
-                        {"role": "user", "content": f"Extraire les métadonnées:\n\n{combined_text}"}
-                    ],
-                    "temperature": 0.0,  # Zero for strict extraction
-                    "max_tokens": 4000
-                }
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"DeepSeek API error {response.status_code}: {response.text}")
-            
-            result = response.json()
+        content = await chat_completion(
+            {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": AVIS_EXTRACTION_PROMPT},
+                    {"role": "user", "content": f"Extraire les métadonnées:\n\n{combined_text}"}
+                ],
+                "temperature": 0.0,  # Zero for strict extraction
+                "max_tokens": 2000,  # full schema incl. 3x10 keywords stays well under this
+                "response_format": {"type": "json_object"}  # bare JSON, no fences
+            },
+            timeout=self.timeout
+        )
         
         # Parse response
-        content = result["choices"][0]["message"]["content"]
-        
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
         try:
-            data = json.loads(content.strip())
-        except json.JSONDecodeError as e:
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError as e:
             raise Exception(f"JSON parse error: {e}")
         
         # Apply website deadline override (MANDATORY)
@@ -352,6 +365,32 @@ class AvisExtractor:
         
         return self._parse_response(data)
     
+    async def extract_metadata_many(
+        self,
+        tenders: list[dict],
+        concurrency: Optional[int] = None
+    ) -> list[AvisMetadata | Exception]:
+        """
+        Extract Avis metadata for several tenders, `concurrency` at a time.
+        
+        Args:
+            tenders: List of extract_metadata kwargs ({documents, website_deadline})
+            concurrency: In-flight extractions (default: deepseek_concurrency)
+            
+        Returns:
+            AvisMetadata or the raised exception, in input order
+        """
+        slots = asyncio.Semaphore(max(1, concurrency or settings.deepseek_concurrency))
+        
+        async def extract(tender: dict) -> AvisMetadata:
+            async with slots:
+                return await self.extract_metadata(**tender)
+        
+        return await asyncio.gather(
+            *(extract(tender) for tender in tenders),
+            return_exceptions=True
+        )
+    
     def _parse_response(self, data: dict) -> AvisMetadata:
         """Parse API response into AvisMetadata."""
         
@@ -407,5 +446,38 @@ class AvisExtractor:
         )
     
     def to_dict(self, metadata: AvisMetadata) -> dict:
-        """Convert AvisMetadata to dictionary."""
-        return asdict(metadata)
+        """
+        Convert AvisMetadata to dictionary.
+        
+        Built field by field: same output as dataclasses.asdict, without its
+        generic recursion and deepcopy of every leaf.
+        """
+        deadline = metadata.submission_deadline
+        keywords = metadata.keywords
+        return {
+            "reference_tender": _provenance_dict(metadata.reference_tender),
+            "tender_type": _provenance_dict(metadata.tender_type),
+            "issuing_institution": _provenance_dict(metadata.issuing_institution),
+            "submission_deadline": {
+                "date": _provenance_dict(deadline.date),
+                "time": _provenance_dict(deadline.time),
+            },
+            "folder_opening_location": _provenance_dict(metadata.folder_opening_location),
+            "subject": _provenance_dict(metadata.subject),
+            "total_estimated_value": _provenance_dict(metadata.total_estimated_value),
+            "currency": metadata.currency,
+            "lots": [
+                {
+                    "lot_number": lot.lot_number,
+                    "lot_subject": lot.lot_subject,
+                    "lot_estimated_value": lot.lot_estimated_value,
+                    "caution_provisoire": lot.caution_provisoire,
+                }
+                for lot in metadata.lots
+            ],
+            "keywords": {
+                "keywords_fr": list(keywords.keywords_fr),
+                "keywords_eng": list(keywords.keywords_eng),
+                "keywords_ar": list(keywords.keywords_ar),
+            },
+        }
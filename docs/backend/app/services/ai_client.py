@@ -0,0 +1,111 @@
+"""
+Shared DeepSeek HTTP client.
+
+One pooled httpx.AsyncClient per event loop instead of one per call,
+so TLS handshakes are amortized and connections are reused (HTTP/2
+multiplexing when `h2` is installed). The client carries the DeepSeek
+base URL and auth headers; callers post to "/chat/completions".
+"""
+
+import asyncio
+import hashlib
+from typing import Optional
+
+import httpx
+import orjson
+
+from app.config import settings
+from app.services.ai_throttle import deepseek_throttle
+from app.services.cache import TTLCache
+from app.services.coalesce import SingleFlight
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Exact-match completions: same model + messages + sampling params -> same reply
+completion_cache = TTLCache(ttl=settings.ai_completion_cache_ttl, maxsize=256)
+completion_calls = SingleFlight()
+
+
+def get_ai_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it for the running loop if needed."""
+    global _client, _client_loop
+    
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # Connection pool at least as large as the throttle's concurrency cap
+        size = max(1, settings.deepseek_concurrency)
+        headers = {"Content-Type": "application/json"}
+        if settings.deepseek_api_key:
+            headers["Authorization"] = f"Bearer {settings.deepseek_api_key}"
+        _client = httpx.AsyncClient(
+            base_url=settings.deepseek_base_url,
+            headers=headers,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=size,
+                max_keepalive_connections=size,
+                keepalive_expiry=60.0  # keep idle connections across bursts of calls
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        _client_loop = loop
+    
+    return _client
+
+
+async def close_ai_client():
+    """Close the shared client (application shutdown)."""
+    global _client, _client_loop
+    
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+async def chat_completion(payload: dict, timeout: float, use_cache: bool = True) -> str:
+    """
+    POST a chat completion and return the reply text.
+    
+    Replies are cached by a SHA-256 of the whole payload (prompt text
+    included, so editing a prompt invalidates its entries). Use for
+    deterministic calls (temperature 0) whose input repeats, such as
+    re-analysing unchanged tender documents. Concurrent identical calls
+    are coalesced into one request.
+    
+    use_cache=False (forced re-runs) skips the lookup and always asks the
+    API; the fresh reply still replaces the cache entry.
+    """
+    # Serialized once: the same bytes are the cache key and the request body
+    body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    key = hashlib.sha256(body).hexdigest()
+    if use_cache:
+        cached = completion_cache.get(key)
+        if cached is not None:
+            return cached
+    
+    async def post() -> str:
+        response = await deepseek_throttle.post(
+            get_ai_client(),
+            "/chat/completions",
+            timeout=timeout,
+            content=body
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"DeepSeek API error {response.status_code}: {response.text}")
+        
+        content = orjson.loads(response.content)["choices"][0]["message"]["content"]
+        completion_cache.set(key, content)
+        return content
+    
+    # Identical payloads already in flight share that one request
+    return await completion_calls.run(key, post)
@@ -5,22 +5,24 @@ Integrates Avis Metadata Extraction with database.
 Handles document classification, annex override, and website deadline override.
 """
 
-import json
 from typing import Optional
 from uuid import UUID
 from datetime import datetime
-from dataclasses import asdict
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, exists, func
+
+import orjson
 
 from app.models.tender import (
     Tender, TenderDocument, TenderField, ProcessingState,
     FieldSource, OCRStatus
 )
 from app.services.ai_analyzer import (
-    AvisExtractor, AvisMetadata, DocumentType
+    AvisExtractor, AvisMetadata, DocumentType, DOCUMENT_TOKEN_BUDGET
 )
+from app.services.fields_db import field_row, store_fields
+from app.services.tokens import max_kept_chars
 
 
 class AIDBService:
@@ -58,18 +60,53 @@ class AIDBService:
         Returns:
             Analysis summary with provenance
         """
-        tender = self.db.query(Tender).filter(Tender.id == tender_id).first()
+        tender = self.db.query(Tender).options(
+            *self._extraction_load_options()
+        ).filter(Tender.id == tender_id).first()
         if not tender:
             return {"error": "Tender not found"}
         
-        # Get documents with extracted text
-        documents = self.db.query(TenderDocument).filter(
-            and_(
-                TenderDocument.tender_id == tender_id,
-                TenderDocument.extracted_text.isnot(None),
-                TenderDocument.ocr_status == OCRStatus.COMPLETED
-            )
-        ).all()
+        prepared = self._prepare_extraction(tender, website_deadline)
+        if "error" in prepared:
+            return prepared
+        
+        # Extract metadata
+        try:
+            metadata = await self.extractor.extract_metadata(**prepared)
+        except Exception as e:
+            return {"error": f"Extraction failed: {str(e)}"}
+        
+        return self._complete_extraction(tender, metadata, prepared["documents"])
+    
+    def _extraction_load_options(self) -> tuple:
+        """
+        Eager loads for _prepare_extraction: documents and state.
+        
+        Only the prefix of each text the prompt can use is fetched.
+        """
+        return (
+            selectinload(Tender.documents).with_expression(
+                TenderDocument.extracted_text_head,
+                func.substr(TenderDocument.extracted_text, 1, max_kept_chars(DOCUMENT_TOKEN_BUDGET))
+            ),
+            joinedload(Tender.processing_state),
+        )
+    
+    def _prepare_extraction(self, tender: Tender, website_deadline: Optional[dict]) -> dict:
+        """
+        extract_metadata kwargs for a tender, or {"error": ...}.
+        
+        Expects tender loaded with _extraction_load_options().
+        """
+        # Documents with extracted text
+        documents = sorted(
+            (
+                doc for doc in tender.documents
+                if doc.extracted_text_head is not None and doc.ocr_status == OCRStatus.COMPLETED
+            ),
+            # Batched inserts share created_at (transaction time): filename, then id, break ties
+            key=lambda doc: (doc.created_at, doc.filename, doc.id)
+        )
         
         if not documents:
             return {"error": "No extracted text available"}
@@ -81,13 +118,13 @@ class AIDBService:
         doc_list = []
         for doc in documents:
             # Classify by content keywords
-            first_page = (doc.extracted_text or "")[:3000]
+            first_page = (doc.extracted_text_head or "")[:3000]
             doc_type = self.extractor.classify_document(first_page)
             
             doc_list.append({
                 "id": str(doc.id),
                 "filename": doc.filename,
-                "content": doc.extracted_text,
+                "content": doc.extracted_text_head,
                 "doc_type": doc_type,
                 "position": len(doc_list)  # For sorting
             })
@@ -99,20 +136,21 @@ class AIDBService:
                 "time": tender.deadline.strftime("%H:%M")
             }
         
-        # Extract metadata
+        return {"documents": doc_list, "website_deadline": website_deadline}
+    
+    def _complete_extraction(self, tender: Tender, metadata: AvisMetadata, doc_list: list[dict]) -> dict:
+        """Store extracted metadata and mark the tender analyzed, in one commit."""
         try:
-            metadata = await self.extractor.extract_metadata(
-                documents=doc_list,
-                website_deadline=website_deadline
-            )
-        except Exception as e:
-            return {"error": f"Extraction failed: {str(e)}"}
-        
-        # Store results
-        fields_stored = self._store_metadata(tender_id, metadata, doc_list)
-        
-        # Update processing state
-        self._update_processing_state(tender_id)
+            # Store results
+            fields_stored = self._store_metadata(tender.id, metadata, doc_list)
+            
+            # Update processing state
+            self._update_processing_state(tender.processing_state)
+            
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         
         return {
             "status": "completed",
@@ -128,30 +166,32 @@ class AIDBService:
         metadata: AvisMetadata,
         documents: list[dict]
     ) -> int:
-        """Store Avis metadata with provenance tracking."""
+        """Store Avis metadata with provenance tracking; caller commits."""
         fields_stored = 0
+        fields = []
         
-        # Get primary document ID
-        primary_doc_id = None
+        # Lookups built once: first document of each type, lowercased filenames
+        by_type = {}
         for doc in documents:
-            if doc.get("doc_type") == DocumentType.AVIS:
-                primary_doc_id = doc["id"]
-                break
+            by_type.setdefault(doc.get("doc_type"), doc["id"])
+        filenames = [(doc["filename"].lower(), doc["id"]) for doc in documents]
+        
+        # Get primary document ID
+        primary_doc_id = by_type.get(DocumentType.AVIS)
         if not primary_doc_id and documents:
             primary_doc_id = documents[0]["id"]
         
         # Store complete metadata as JSON
         metadata_dict = self.extractor.to_dict(metadata)
-        self._store_field(
-            tender_id=tender_id,
+        fields.append(field_row(
             field_name="avis_metadata",
-            field_value=json.dumps(metadata_dict, default=str),
+            field_value=orjson.dumps(metadata_dict, default=str).decode(),
             field_type="json",
             source=FieldSource.AI,
             confidence=0.9,
             document_id=primary_doc_id,
             source_location="avis_extraction"
-        )
+        ))
         fields_stored += 1
         
         # Store individual provenance fields
@@ -166,9 +206,8 @@ class AIDBService:
         
         for field_name, prov_field in provenance_fields:
             if prov_field and prov_field.value:
-                doc_id = self._find_doc_id(prov_field.source_document, documents) or primary_doc_id
-                self._store_field(
-                    tender_id=tender_id,
+                doc_id = self._find_doc_id(prov_field.source_document, filenames) or primary_doc_id
+                fields.append(field_row(
                     field_name=f"avis_{field_name}",
                     field_value=str(prov_field.value),
                     field_type="text",
@@ -176,16 +215,15 @@ class AIDBService:
                     confidence=0.9,
                     document_id=doc_id,
                     source_location=prov_field.source_document
-                )
+                ))
                 fields_stored += 1
         
         # Store submission deadline
         if metadata.submission_deadline.date.value:
             doc_id = self._find_doc_id(
-                metadata.submission_deadline.date.source_document, documents
+                metadata.submission_deadline.date.source_document, filenames
             ) or primary_doc_id
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="avis_submission_deadline_date",
                 field_value=metadata.submission_deadline.date.value,
                 field_type="date",
@@ -193,12 +231,11 @@ class AIDBService:
                 confidence=0.95 if metadata.submission_deadline.date.source_document == "Website" else 0.9,
                 document_id=doc_id,
                 source_location=metadata.submission_deadline.date.source_document
-            )
+            ))
             fields_stored += 1
         
         if metadata.submission_deadline.time.value:
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="avis_submission_deadline_time",
                 field_value=metadata.submission_deadline.time.value,
                 field_type="text",
@@ -206,134 +243,96 @@ class AIDBService:
                 confidence=0.95 if metadata.submission_deadline.time.source_document == "Website" else 0.9,
                 document_id=primary_doc_id,
                 source_location=metadata.submission_deadline.time.source_document
-            )
+            ))
             fields_stored += 1
         
         # Store lots
         if metadata.lots:
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="avis_lots",
-                field_value=json.dumps([asdict(lot) for lot in metadata.lots], default=str),
+                field_value=orjson.dumps(metadata_dict["lots"], default=str).decode(),
                 field_type="json",
                 source=FieldSource.AI,
                 confidence=0.9,
                 document_id=primary_doc_id,
                 source_location="avis_extraction"
-            )
+            ))
             fields_stored += 1
         
         # Store keywords (CRITICAL for search)
         if metadata.keywords:
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="keywords_fr",
-                field_value=json.dumps(metadata.keywords.keywords_fr),
+                field_value=orjson.dumps(metadata.keywords.keywords_fr).decode(),
                 field_type="list",
                 source=FieldSource.AI,
                 confidence=0.85,
                 document_id=primary_doc_id,
                 source_location="avis_extraction"
-            )
-            self._store_field(
-                tender_id=tender_id,
+            ))
+            fields.append(field_row(
                 field_name="keywords_eng",
-                field_value=json.dumps(metadata.keywords.keywords_eng),
+                field_value=orjson.dumps(metadata.keywords.keywords_eng).decode(),
                 field_type="list",
                 source=FieldSource.AI,
                 confidence=0.85,
                 document_id=primary_doc_id,
                 source_location="avis_extraction"
-            )
-            self._store_field(
-                tender_id=tender_id,
+            ))
+            fields.append(field_row(
                 field_name="keywords_ar",
-                field_value=json.dumps(metadata.keywords.keywords_ar),
+                field_value=orjson.dumps(metadata.keywords.keywords_ar).decode(),
                 field_type="list",
                 source=FieldSource.AI,
                 confidence=0.85,
                 document_id=primary_doc_id,
                 source_location="avis_extraction"
-            )
+            ))
             fields_stored += 3
         
-        self.db.commit()
+        store_fields(self.db, tender_id, fields)
         return fields_stored
     
-    def _find_doc_id(self, source_document: Optional[str], documents: list[dict]) -> Optional[str]:
-        """Find document ID by source name."""
+    def _find_doc_id(self, source_document: Optional[str], filenames: list[tuple[str, str]]) -> Optional[str]:
+        """Find document ID by source name in (lowercased filename, id) pairs."""
         if not source_document or source_document == "Website":
             return None
         
-        for doc in documents:
-            if source_document.lower() in doc["filename"].lower():
-                return doc["id"]
+        source = source_document.lower()
+        for filename, doc_id in filenames:
+            if source in filename:
+                return doc_id
         
         return None
     
-    def _store_field(
-        self,
-        tender_id: UUID,
-        field_name: str,
-        field_value: str,
-        field_type: str,
-        source: FieldSource,
-        confidence: float,
-        document_id: Optional[str],
-        source_location: Optional[str]
-    ):
-        """Store or update a field with provenance."""
-        existing = self.db.query(TenderField).filter(
-            and_(
-                TenderField.tender_id == tender_id,
-                TenderField.field_name == field_name
-            )
-        ).first()
-        
-        if existing:
-            existing.field_value = field_value
-            existing.field_type = field_type
-            existing.source = source
-            existing.confidence = confidence
-            existing.source_location = source_location
-            existing.updated_at = datetime.utcnow()
-            if document_id:
-                existing.document_id = UUID(document_id)
-        else:
-            field = TenderField(
-                tender_id=tender_id,
-                document_id=UUID(document_id) if document_id else None,
-                field_name=field_name,
-                field_value=field_value,
-                field_type=field_type,
-                source=source,
-                confidence=confidence,
-                source_location=source_location
-            )
-            self.db.add(field)
-    
-    def _update_processing_state(self, tender_id: UUID):
-        """Update processing state."""
-        state = self.db.query(ProcessingState).filter(
-            ProcessingState.tender_id == tender_id
-        ).first()
-        
+    def _update_processing_state(self, state: Optional[ProcessingState]):
+        """Update processing state; caller commits."""
         if state:
-            state.ai_analyzed = True
-            state.ai_analyzed_at = datetime.utcnow()
+            state.analysis_completed_at = datetime.utcnow()
             state.updated_at = datetime.utcnow()
-        
-        self.db.commit()
     
     async def analyze_pending_tenders(self, limit: int = 10) -> dict:
         """Analyze tenders with extracted text but no AI analysis."""
-        # Find pending tenders
-        pending = self.db.query(Tender).join(ProcessingState).filter(
+        # Pending = has an extracted document, has no Avis metadata yet (one query)
+        has_text = exists().where(
+            and_(
+                TenderDocument.tender_id == Tender.id,
+                TenderDocument.extracted_text.isnot(None),
+                TenderDocument.ocr_status == OCRStatus.COMPLETED
+            )
+        )
+        analyzed = exists().where(
             and_(
-                ProcessingState.text_extracted == True,
-                ProcessingState.ai_analyzed == False
+                TenderField.tender_id == Tender.id,
+                TenderField.field_name == "avis_metadata"
             )
-        ).limit(limit).all()
+        )
+        pending = self.db.query(Tender).options(
+            *self._extraction_load_options()
+        ).filter(
+            has_text,
+            ~analyzed
+        ).order_by(Tender.created_at).limit(limit).all()
         
         results = {
             "total_pending": len(pending),
@@ -341,13 +340,27 @@ class AIDBService:
             "errors": []
         }
         
+        # DB reads and writes stay sequential on this session; only the
+        # DeepSeek calls run concurrently (bounded by deepseek_concurrency)
+        jobs = []
         for tender in pending:
+            prepared = self._prepare_extraction(tender, None)
+            if "error" in prepared:
+                results["errors"].append(f"{tender.reference}: {prepared['error']}")
+            else:
+                jobs.append((tender, prepared))
+        
+        outcomes = await self.extractor.extract_metadata_many(
+            [prepared for _, prepared in jobs]
+        )
+        
+        for (tender, prepared), metadata in zip(jobs, outcomes):
+            if isinstance(metadata, Exception):
+                results["errors"].append(f"{tender.reference}: Extraction failed: {str(metadata)}")
+                continue
             try:
-                result = await self.analyze_tender(tender.id)
-                if "error" not in result:
-                    results["analyzed"] += 1
-                else:
-                    results["errors"].append(f"{tender.reference}: {result['error']}")
+                self._complete_extraction(tender, metadata, prepared["documents"])
+                results["analyzed"] += 1
             except Exception as e:
                 results["errors"].append(f"{tender.reference}: {str(e)}")
         
@@ -0,0 +1,128 @@
+"""
+DeepSeek backpressure.
+
+Every DeepSeek call goes through one process-wide throttle:
+- concurrency cap (semaphore)
+- minimum interval between request starts (requests per second)
+- retry with exponential backoff + jitter on 429 / 5xx and on timeouts /
+  dropped connections (3 retries)
+
+Endpoints check `saturated` and answer 429 instead of queueing forever.
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Transient transport failures (incl. a pooled connection the server closed)
+RETRY_ERRORS = (httpx.TimeoutException, httpx.ConnectError, httpx.RemoteProtocolError)
+
+
+class AIThrottle:
+    """Concurrency + rate limiter for upstream AI calls."""
+
+    def __init__(
+        self,
+        concurrency: int,
+        rps: float,
+        max_queue: int,
+        retries: int = 3,
+        backoff_min: float = 1.0,
+        backoff_max: float = 30.0
+    ):
+        self.concurrency = max(1, concurrency)
+        self.min_interval = 1.0 / rps if rps > 0 else 0.0
+        self.max_queue = max_queue
+        self.retries = retries
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.waiting = 0
+        self._last_start = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._pace: Optional[asyncio.Lock] = None
+
+    def _bind(self):
+        """asyncio primitives belong to one loop; rebuild them if the loop changed (CLI)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.concurrency)
+            self._pace = asyncio.Lock()
+            self.waiting = 0
+
+    @property
+    def saturated(self) -> bool:
+        """True when the wait queue is full (0 disables load shedding)."""
+        return self.max_queue > 0 and self.waiting >= self.max_queue
+
+    async def __aenter__(self):
+        self._bind()
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        
+        try:
+            async with self._pace:
+                delay = self.min_interval - (time.monotonic() - self._last_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._last_start = time.monotonic()
+        except BaseException:
+            self._sem.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self._sem.release()
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Exponential backoff with jitter; honours a numeric Retry-After."""
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        delay = self.backoff_min * (2 ** attempt) + random.uniform(0, self.backoff_min)
+        return min(delay, self.backoff_max)
+
+    async def post(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """
+        POST through the throttle, retrying rate limits and server errors.
+
+        Returns the last response; callers keep their own status handling.
+        Transport errors are re-raised once retries are exhausted.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with self:
+                    response = await client.post(url, **kwargs)
+            except RETRY_ERRORS:
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, None))
+                continue
+            
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            
+            # Back off outside the semaphore so other calls can proceed
+            await asyncio.sleep(self._backoff(attempt, response))
+        
+        return response
+
+
+deepseek_throttle = AIThrottle(
+    concurrency=settings.deepseek_concurrency,
+    rps=settings.deepseek_rps,
+    max_queue=settings.deepseek_max_queue
+)
@@ -7,13 +7,19 @@ No embeddings (V1) - sends full context to LLM.
 """
 
 import json
-import httpx
+import re
 from dataclasses import dataclass, field
 from typing import Optional, Any
 from uuid import UUID
 from datetime import datetime
 
 from app.config import settings
+from app.services.ai_client import get_ai_client
+from app.services.ai_throttle import deepseek_throttle
+
+
+# Body of the first ``` / ```json fence (an unclosed fence runs to the end)
+JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|\Z)", re.DOTALL)
 
 
 @dataclass
@@ -219,35 +225,32 @@ Réponds en JSON avec les citations appropriées."""
         messages.append({"role": "user", "content": user_message})
         
         # Call DeepSeek API
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": 0.3,  # Lower for factual responses
-                    "max_tokens": 4000
-                }
-            )
-            
-            if response.status_code != 200:
-                error_text = response.text
-                raise Exception(f"DeepSeek API error {response.status_code}: {error_text}")
-            
-            result = response.json()
+        client = get_ai_client()
+        response = await deepseek_throttle.post(
+            client,
+            "/chat/completions",
+            timeout=self.timeout,
+            json={
+                "model": self.model,
+                "messages": messages,
+                "temperature": 0.3,  # Lower for factual responses
+                "max_tokens": 4000
+            }
+        )
+        
+        if response.status_code != 200:
+            error_text = response.text
+            raise Exception(f"DeepSeek API error {response.status_code}: {error_text}")
+        
+        result = response.json()
         
         # Parse response
         content = result["choices"][0]["message"]["content"]
         
         # Clean JSON
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
+        fenced = JSON_FENCE_RE.search(content)
+        if fenced:
+            content = fenced.group(1)
         
         try:
             data = json.loads(content.strip())
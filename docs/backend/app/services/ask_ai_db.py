@@ -5,20 +5,66 @@ Integrates Ask AI with tender data from database.
 Stores conversation history for context.
 """
 
+import hashlib
 import json
 from typing import Optional, Any
 from uuid import UUID
 from datetime import datetime
 from dataclasses import asdict
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from sqlalchemy import and_, desc
 
+from app.config import settings
 from app.models.tender import (
     Tender, TenderDocument, TenderField, 
     OCRStatus, FieldSource
 )
 from app.services.ask_ai import AskAIService, AskAIResponse, SourceCitation
+from app.services.cache import TTLCache
+
+
+# Successful answers keyed by (tender, normalized question, recent history)
+answer_cache = TTLCache(ttl=settings.ask_ai_cache_ttl)
+
+
+def _answer_cache_key(
+    tender_id: UUID,
+    question: str,
+    conversation_history: Optional[list[dict]]
+) -> str:
+    """Exact-match key; history is trimmed like AskAIService.ask does."""
+    normalized = " ".join(question.lower().split())
+    history = json.dumps(
+        [[e.get("question", ""), e.get("answer", "")] for e in (conversation_history or [])[-5:]],
+        ensure_ascii=False
+    )
+    raw = f"{tender_id}|{normalized}|{history}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Static per language: built once at import, copied per call
+SUGGESTED_QUESTIONS = {
+    "ar-ma": (
+        "شنو هي الوثائق اللي خاصني نقدم؟",
+        "شحال الثمن ديال الكفالة؟",
+        "كيفاش نقدر نشارك فهاد الصفقة؟",
+        "آش هي الشروط التقنية؟",
+        "فين وفوقتاش نقدر نقدم العرض ديالي؟",
+        "واش كاين شي زيارة للموقع؟",
+        "شحال المدة ديال التنفيذ؟",
+    ),
+    "fr": (
+        "Quels documents dois-je fournir pour soumissionner ?",
+        "Quel est le montant de la caution provisoire ?",
+        "Quelles sont les conditions d'éligibilité ?",
+        "Quelle est la date limite de dépôt des offres ?",
+        "Quels sont les critères d'attribution ?",
+        "Y a-t-il une visite des lieux obligatoire ?",
+        "Quel est le délai d'exécution prévu ?",
+        "Quelles sont les garanties demandées ?",
+    ),
+}
 
 
 class AskAIDBService:
@@ -54,7 +100,9 @@ class AskAIDBService:
     
     def _get_documents(self, tender_id: UUID) -> list[dict]:
         """Get all extracted documents for a tender."""
-        documents = self.db.query(TenderDocument).filter(
+        documents = self.db.query(TenderDocument).options(
+            undefer(TenderDocument.extracted_text)
+        ).filter(
             and_(
                 TenderDocument.tender_id == tender_id,
                 TenderDocument.extracted_text.isnot(None),
@@ -127,6 +175,11 @@ class AskAIDBService:
         Returns:
             Response dict with answer and citations
         """
+        cache_key = _answer_cache_key(tender_id, question, conversation_history)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # Get tender
         tender = self.db.query(Tender).filter(Tender.id == tender_id).first()
         if not tender:
@@ -160,7 +213,7 @@ class AskAIDBService:
             return {"error": f"AI service error: {str(e)}"}
         
         # Format response
-        return {
+        result = {
             "answer": response.answer,
             "language_detected": response.language_detected,
             "citations": [asdict(c) for c in response.citations],
@@ -169,6 +222,8 @@ class AskAIDBService:
             "tender_reference": tender.reference,
             "documents_used": len(documents)
         }
+        answer_cache.set(cache_key, result)
+        return result
     
     def get_tender_summary(self, tender_id: UUID) -> dict:
         """
@@ -205,24 +260,5 @@ class AskAIDBService:
         Returns:
             List of suggested questions
         """
-        if language == "ar-ma":
-            return [
-                "شنو هي الوثائق اللي خاصني نقدم؟",
-                "شحال الثمن ديال الكفالة؟",
-                "كيفاش نقدر نشارك فهاد الصفقة؟",
-                "آش هي الشروط التقنية؟",
-                "فين وفوقتاش نقدر نقدم العرض ديالي؟",
-                "واش كاين شي زيارة للموقع؟",
-                "شحال المدة ديال التنفيذ؟"
-            ]
-        else:
-            return [
-                "Quels documents dois-je fournir pour soumissionner ?",
-                "Quel est le montant de la caution provisoire ?",
-                "Quelles sont les conditions d'éligibilité ?",
-                "Quelle est la date limite de dépôt des offres ?",
-                "Quels sont les critères d'attribution ?",
-                "Y a-t-il une visite des lieux obligatoire ?",
-                "Quel est le délai d'exécution prévu ?",
-                "Quelles sont les garanties demandées ?"
-            ]
+        questions = SUGGESTED_QUESTIONS.get(language, SUGGESTED_QUESTIONS["fr"])
+        return list(questions)
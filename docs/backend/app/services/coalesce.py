@@ -0,0 +1,37 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same AI work share one upstream call:
+the first caller runs it, later callers with the same key await its result.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Deduplicate in-flight coroutines by key."""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the in-flight call for `key`, or start one with `factory()`.
+
+        The shared task is shielded so one caller disconnecting does not
+        cancel the work for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """True if a call for `key` is currently running."""
+        return key in self._inflight
+
+
+ai_calls = SingleFlight()
@@ -9,17 +9,26 @@ import json
 from typing import Optional
 from uuid import UUID
 from datetime import datetime
-from dataclasses import asdict
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, with_expression
+from sqlalchemy import and_, func
 
+import orjson
+
+from app.config import settings
 from app.models.tender import (
     Tender, TenderDocument, TenderField, ProcessingState,
     FieldSource, OCRStatus
 )
-from app.services.deep_analyzer import DeepAnalyzer, UniversalFields
-from app.services.ai_analyzer import DocumentType, DOCUMENT_DETECTION_KEYWORDS
+from app.services.cache import TTLCache
+from app.services.deep_analyzer import DeepAnalyzer, UniversalFields, DOCUMENT_TOKEN_BUDGET
+from app.services.ai_analyzer import DocumentType, detect_document_type
+from app.services.fields_db import field_row, store_fields
+from app.services.tokens import max_kept_chars
+
+
+# Parsed `universal_analysis` blobs keyed by tender id (cache-aside)
+deep_analysis_cache = TTLCache(ttl=settings.deep_analysis_cache_ttl)
 
 
 class DeepAnalysisDBService:
@@ -71,7 +80,12 @@ class DeepAnalysisDBService:
         return docs_with_text > 0
     
     def get_deep_analysis(self, tender_id: UUID) -> Optional[dict]:
-        """Get existing deep analysis results."""
+        """Get existing deep analysis results (cached in-process)."""
+        tid = str(tender_id)
+        cached = deep_analysis_cache.get(tid)
+        if cached is not None:
+            return cached
+        
         field = self.db.query(TenderField).filter(
             and_(
                 TenderField.tender_id == tender_id,
@@ -81,35 +95,37 @@ class DeepAnalysisDBService:
         
         if field:
             try:
-                return json.loads(field.field_value)
+                analysis = json.loads(field.field_value)
             except json.JSONDecodeError:
                 return None
+            deep_analysis_cache.set(tid, analysis)
+            return analysis
         
         return None
     
     def _classify_document(self, first_page: str) -> str:
         """Classify document by content keywords."""
-        text_lower = first_page.lower()
-        
-        for doc_type, keywords in DOCUMENT_DETECTION_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return doc_type.value
-        
-        return "unknown"
+        return detect_document_type(first_page).value
     
-    async def perform_deep_analysis(self, tender_id: UUID) -> dict:
+    async def perform_deep_analysis(self, tender_id: UUID, force: bool = False) -> dict:
         """
         Perform Universal Deep Analysis.
         
         This is triggered when user opens tender detail.
-        NOT a background job.
+        NOT a background job. force=True re-asks the model instead of
+        reusing a cached completion.
         """
         tender = self.db.query(Tender).filter(Tender.id == tender_id).first()
         if not tender:
             return {"error": "Tender not found"}
         
-        documents = self.db.query(TenderDocument).filter(
+        # Only the prefix of each text the prompt can use is fetched
+        documents = self.db.query(TenderDocument).options(
+            with_expression(
+                TenderDocument.extracted_text_head,
+                func.substr(TenderDocument.extracted_text, 1, max_kept_chars(DOCUMENT_TOKEN_BUDGET))
+            )
+        ).filter(
             and_(
                 TenderDocument.tender_id == tender_id,
                 TenderDocument.extracted_text.isnot(None),
@@ -126,13 +142,13 @@ class DeepAnalysisDBService:
         # Prepare documents with classification
         doc_list = []
         for doc in documents:
-            first_page = (doc.extracted_text or "")[:3000]
+            first_page = (doc.extracted_text_head or "")[:3000]
             doc_type = self._classify_document(first_page)
             
             doc_list.append({
                 "id": str(doc.id),
                 "filename": doc.filename,
-                "content": doc.extracted_text,
+                "content": doc.extracted_text_head,
                 "doc_type": doc_type
             })
         
@@ -143,7 +159,8 @@ class DeepAnalysisDBService:
         try:
             result = await self.analyzer.analyze_documents(
                 documents=doc_list,
-                existing_avis=existing_avis
+                existing_avis=existing_avis,
+                use_cache=not force
             )
         except Exception as e:
             return {"error": f"Analysis failed: {str(e)}"}
@@ -192,33 +209,27 @@ class DeepAnalysisDBService:
     ) -> int:
         """Store Universal Deep Analysis results."""
         fields_stored = 0
+        fields = []
         
-        # Find primary document (CPS preferred)
-        primary_doc_id = None
+        # Find primary document (CPS preferred, then RC)
+        by_type = {}
         for doc in documents:
-            if doc.get("doc_type") == "cps":
-                primary_doc_id = doc["id"]
-                break
-        if not primary_doc_id:
-            for doc in documents:
-                if doc.get("doc_type") == "rc":
-                    primary_doc_id = doc["id"]
-                    break
+            by_type.setdefault(doc.get("doc_type"), doc["id"])
+        primary_doc_id = by_type.get("cps") or by_type.get("rc")
         if not primary_doc_id and documents:
             primary_doc_id = documents[0]["id"]
         
         # Store complete analysis
         analysis_dict = self.analyzer.to_dict(result)
-        self._store_field(
-            tender_id=tender_id,
+        fields.append(field_row(
             field_name="universal_analysis",
-            field_value=json.dumps(analysis_dict, default=str),
+            field_value=orjson.dumps(analysis_dict, default=str).decode(),
             field_type="json",
             source=FieldSource.AI,
             confidence=0.9,
             document_id=primary_doc_id,
             source_location="universal_deep_analysis"
-        )
+        ))
         fields_stored += 1
         
         # Store key fields individually for querying
@@ -233,8 +244,7 @@ class DeepAnalysisDBService:
         
         for field_name, value in simple_fields:
             if value:
-                self._store_field(
-                    tender_id=tender_id,
+                fields.append(field_row(
                     field_name=field_name,
                     field_value=str(value),
                     field_type="text",
@@ -242,13 +252,12 @@ class DeepAnalysisDBService:
                     confidence=0.9,
                     document_id=primary_doc_id,
                     source_location="universal_deep_analysis"
-                )
+                ))
                 fields_stored += 1
         
         # Store estimated value
         if result.total_estimated_value:
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="deep_total_estimated_value",
                 field_value=str(result.total_estimated_value),
                 field_type="number",
@@ -256,13 +265,12 @@ class DeepAnalysisDBService:
                 confidence=0.9,
                 document_id=primary_doc_id,
                 source_location="universal_deep_analysis"
-            )
+            ))
             fields_stored += 1
         
         # Store submission deadline
         if result.submission_deadline.date:
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="deep_submission_deadline_date",
                 field_value=result.submission_deadline.date,
                 field_type="date",
@@ -270,12 +278,11 @@ class DeepAnalysisDBService:
                 confidence=0.9,
                 document_id=primary_doc_id,
                 source_location="universal_deep_analysis"
-            )
+            ))
             fields_stored += 1
         
         if result.submission_deadline.time:
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="deep_submission_deadline_time",
                 field_value=result.submission_deadline.time,
                 field_type="text",
@@ -283,67 +290,27 @@ class DeepAnalysisDBService:
                 confidence=0.9,
                 document_id=primary_doc_id,
                 source_location="universal_deep_analysis"
-            )
+            ))
             fields_stored += 1
         
         # Store lots with full structure (including items)
         if result.lots:
-            self._store_field(
-                tender_id=tender_id,
+            fields.append(field_row(
                 field_name="universal_lots",
-                field_value=json.dumps([asdict(lot) for lot in result.lots], default=str),
+                field_value=orjson.dumps(analysis_dict["lots"], default=str).decode(),
                 field_type="json",
                 source=FieldSource.AI,
                 confidence=0.9,
                 document_id=primary_doc_id,
                 source_location="universal_deep_analysis"
-            )
+            ))
             fields_stored += 1
         
+        store_fields(self.db, tender_id, fields)
         self.db.commit()
+        deep_analysis_cache.delete(str(tender_id))
         return fields_stored
     
-    def _store_field(
-        self,
-        tender_id: UUID,
-        field_name: str,
-        field_value: str,
-        field_type: str,
-        source: FieldSource,
-        confidence: float,
-        document_id: Optional[str],
-        source_location: str
-    ):
-        """Store or update a field."""
-        existing = self.db.query(TenderField).filter(
-            and_(
-                TenderField.tender_id == tender_id,
-                TenderField.field_name == field_name
-            )
-        ).first()
-        
-        if existing:
-            existing.field_value = field_value
-            existing.field_type = field_type
-            existing.source = source
-            existing.confidence = confidence
-            existing.source_location = source_location
-            existing.updated_at = datetime.utcnow()
-            if document_id:
-                existing.document_id = UUID(document_id)
-        else:
-            field = TenderField(
-                tender_id=tender_id,
-                document_id=UUID(document_id) if document_id else None,
-                field_name=field_name,
-                field_value=field_value,
-                field_type=field_type,
-                source=source,
-                confidence=confidence,
-                source_location=source_location
-            )
-            self.db.add(field)
-    
     def _update_processing_state(self, tender_id: UUID):
         """Update processing state for deep analysis."""
         state = self.db.query(ProcessingState).filter(
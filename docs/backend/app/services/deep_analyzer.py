@@ -7,11 +7,22 @@ This phase is expensive and must only run on user intent.
 """
 
 import json
-import httpx
+import re
 from dataclasses import dataclass, field, asdict
 from typing import Optional, Any
 
+import orjson
+
 from app.config import settings
+from app.services.ai_client import chat_completion
+from app.services.tokens import truncate_tokens
+
+
+# Per-document prompt budget, in tokens (~40k characters of French text)
+DOCUMENT_TOKEN_BUDGET = 10_000
+
+# "Lot n° 3", "LOT N°3", "lot no 3" -> "3"
+LOT_NUMBER_RE = re.compile(r"\blot\s*n[°o]\s*(\d+)", re.IGNORECASE)
 
 
 @dataclass
@@ -175,17 +186,26 @@ class DeepAnalyzer:
         """
         priority_order = {"annexe": 0, "cps": 1, "rc": 2, "avis": 3, "unknown": 4}
         
-        # Sort: highest priority last (to override)
+        # Sort: highest priority last (to override); filename keeps ties in a
+        # fixed order so the same documents always build the same prompt
         return sorted(
             documents,
-            key=lambda x: priority_order.get(x.get("doc_type", "unknown"), 4),
-            reverse=True  # Lower priority first, higher priority last
+            key=lambda x: (-priority_order.get(x.get("doc_type", "unknown"), 4), x.get("filename", ""))
         )
     
+    def _max_output_tokens(self, text: str) -> int:
+        """
+        Output budget sized to the tender: most of the JSON is per lot, so
+        allow ~1000 tokens per extra lot above a single-lot baseline.
+        """
+        lots = len(set(LOT_NUMBER_RE.findall(text))) or 1
+        return min(8000, 4000 + 1000 * (lots - 1))
+    
     async def analyze_documents(
         self,
         documents: list[dict],
-        existing_avis: Optional[dict] = None
+        existing_avis: Optional[dict] = None,
+        use_cache: bool = True
     ) -> UniversalFields:
         """
         Perform Universal Deep Analysis.
@@ -193,6 +213,7 @@ class DeepAnalyzer:
         Args:
             documents: List of {filename, content, doc_type}
             existing_avis: Avis metadata for reference
+            use_cache: False to bypass the completion cache (forced re-analysis)
             
         Returns:
             UniversalFields with full structure
@@ -211,51 +232,37 @@ class DeepAnalyzer:
                 f"\n{'='*60}\n"
                 f"[{doc_type}] {doc['filename']}\n"
                 f"{'='*60}\n"
-                f"{doc['content'][:40000]}"  # Larger limit for deep analysis
+                f"{truncate_tokens(doc['content'], DOCUMENT_TOKEN_BUDGET)}"  # Larger limit for deep analysis
             )
         
         combined_text = "\n\n".join(doc_texts)
         
-        # Add Avis reference if available
+        # Add Avis reference if available (after the documents, so the
+        # system prompt + documents prefix is reusable by DeepSeek's cache)
         avis_context = ""
         if existing_avis:
             avis_context = f"\n\n[RÉFÉRENCE AVIS]\n{json.dumps(existing_avis, indent=2, default=str)}\n"
         
         # Call DeepSeek API
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": UNIVERSAL_ANALYSIS_PROMPT},
-                        {"role": "user", "content": f"Analyse complète:{avis_context}\n\n{combined_text}"}
-                    ],
-                    "temperature": 0.0,  # Zero for strict extraction
-                    "max_tokens": 8000
-                }
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"DeepSeek API error {response.status_code}: {response.text}")
-            
-            result = response.json()
+        content = await chat_completion(
+            {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": UNIVERSAL_ANALYSIS_PROMPT},
+                    {"role": "user", "content": f"Analyse complète:\n\n{combined_text}{avis_context}"}
+                ],
+                "temperature": 0.0,  # Zero for strict extraction
+                "max_tokens": self._max_output_tokens(combined_text),
+                "response_format": {"type": "json_object"}  # bare JSON, no fences
+            },
+            timeout=self.timeout,
+            use_cache=use_cache
+        )
         
         # Parse response
-        content = result["choices"][0]["message"]["content"]
-        
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
         try:
-            data = json.loads(content.strip())
-        except json.JSONDecodeError as e:
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError as e:
             raise Exception(f"JSON parse error: {e}")
         
         # Parse and compute
@@ -3,10 +3,15 @@ Database integration for text extraction.
 Stores extracted text in PostgreSQL.
 """
 
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from threading import BoundedSemaphore
+from typing import Optional
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
 
+from app.config import settings
 from app.models import (
     Tender,
     TenderDocument,
@@ -18,6 +23,25 @@ from app.services.extractor import TextExtractor, ExtractionResult, ExtractionMe
 from app.services.scraper_db import document_store
 
 
+# OCR is CPU-heavy; cap concurrent extractions across request threads
+_extraction_slots = BoundedSemaphore(max(1, settings.extraction_concurrency))
+
+# Per worker process extractor (PaddleOCR loads once per process)
+_worker_extractor: Optional[TextExtractor] = None
+
+
+def _extract_in_worker(job: tuple[bytes, str]) -> ExtractionResult:
+    """ProcessPoolExecutor entry point: extract one (content, filename)."""
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = TextExtractor()
+    content, filename = job
+    try:
+        return _worker_extractor.extract(content, filename)
+    except Exception as e:
+        return ExtractionResult(text="", method=ExtractionMethod.DIGITAL, success=False, error=str(e))
+
+
 class ExtractionDBService:
     """Service to extract text and update database."""
     
@@ -29,6 +53,10 @@ class ExtractionDBService:
         """
         Process all documents for a tender.
         
+        Documents are marked PROCESSING up front; their results are written
+        with one bulk UPDATE and committed together with the processing state.
+        If that write fails, every claimed document is marked FAILED.
+        
         Args:
             tender_id: Tender UUID
             
@@ -45,93 +73,147 @@ class ExtractionDBService:
             state.status = ProcessingStatus.OCR
             state.current_step = "text_extraction"
             state.ocr_started_at = datetime.utcnow()
-            self.db.commit()
+        # Plain values: the claim commit expires the ORM rows
+        reference = tender.reference
+        documents = []  # (doc id, filename, download url)
+        for doc in tender.documents:
+            doc.ocr_status = OCRStatus.PROCESSING
+            documents.append((doc.id, doc.filename, doc.download_url))
+        self.db.commit()
         
         results = {
             "tender_id": str(tender_id),
-            "reference": tender.reference,
+            "reference": reference,
             "documents": [],
             "success_count": 0,
             "error_count": 0,
         }
         
-        # Process each document
-        for doc in tender.documents:
-            doc_result = self._process_document(tender.reference, doc)
-            results["documents"].append(doc_result)
+        try:
+            # Process each document
+            updates = []
+            for doc_id, filename, download_url in documents:
+                doc_result, values = self._process_document(reference, doc_id, filename, download_url)
+                results["documents"].append(doc_result)
+                updates.append(values)
+                
+                if doc_result["success"]:
+                    results["success_count"] += 1
+                else:
+                    results["error_count"] += 1
             
-            if doc_result["success"]:
-                results["success_count"] += 1
-            else:
-                results["error_count"] += 1
-        
-        # Update processing state
-        if state:
-            state.ocr_completed_at = datetime.utcnow()
-            if results["error_count"] == 0:
-                state.status = ProcessingStatus.COMPLETED
-                state.progress = 100.0
-            else:
-                state.status = ProcessingStatus.FAILED if results["success_count"] == 0 else ProcessingStatus.COMPLETED
-                state.progress = 80.0
+            self._write_updates(updates)
+            
+            # Update processing state
+            if state:
+                state.ocr_completed_at = datetime.utcnow()
+                if results["error_count"] == 0:
+                    state.status = ProcessingStatus.COMPLETED
+                    state.progress = 100.0
+                else:
+                    state.status = ProcessingStatus.FAILED if results["success_count"] == 0 else ProcessingStatus.COMPLETED
+                    state.progress = 80.0
             self.db.commit()
+        except Exception as e:
+            self._release_claimed([doc_id for doc_id, _, _ in documents], str(e))
+            if state:
+                state.status = ProcessingStatus.FAILED
+                self.db.commit()
+            raise
         
         return results
     
-    def _process_document(self, reference: str, doc: TenderDocument) -> dict:
-        """Process a single document."""
-        result = {
-            "document_id": str(doc.id),
-            "filename": doc.filename,
+    def _process_document(
+        self,
+        reference: str,
+        doc_id: UUID,
+        filename: str,
+        download_url: Optional[str]
+    ) -> tuple[dict, dict]:
+        """Process a single document; returns (result entry, UPDATE values)."""
+        result = self._new_result(doc_id, filename)
+        
+        try:
+            content = self._load_content(reference, filename, download_url)
+            
+            # Extract text
+            with _extraction_slots:
+                extraction = self.extractor.extract(content, filename)
+            
+            return result, self._apply_extraction(doc_id, extraction, result)
+            
+        except Exception as e:
+            return result, self._mark_failed(doc_id, str(e), result)
+    
+    def _new_result(self, doc_id: UUID, filename: str) -> dict:
+        """Empty per-document result entry."""
+        return {
+            "document_id": str(doc_id),
+            "filename": filename,
             "success": False,
             "method": None,
             "text_length": 0,
             "page_count": None,
             "error": None,
         }
+    
+    def _load_content(self, reference: str, filename: str, download_url: Optional[str]) -> bytes:
+        """Document bytes from the memory store, else downloaded."""
+        content = document_store.get(reference, filename)
         
-        # Update OCR status
-        doc.ocr_status = OCRStatus.PROCESSING
-        self.db.commit()
-        
-        try:
-            # Get document content from memory store
-            content = document_store.get(reference, doc.filename)
+        if not content:
+            # Try to download from URL if not in memory
+            if download_url:
+                content = self._download_document(download_url)
             
             if not content:
-                # Try to download from URL if not in memory
-                if doc.download_url:
-                    content = self._download_document(doc.download_url)
-                
-                if not content:
-                    raise ValueError("Document content not available")
-            
-            # Extract text
-            extraction = self.extractor.extract(content, doc.filename)
-            
-            if extraction.success:
-                doc.extracted_text = extraction.text
-                doc.ocr_status = OCRStatus.COMPLETED
-                doc.page_count = extraction.page_count
-                
-                result["success"] = True
-                result["method"] = extraction.method.value
-                result["text_length"] = len(extraction.text)
-                result["page_count"] = extraction.page_count
-            else:
-                doc.ocr_status = OCRStatus.FAILED
-                doc.ocr_error = extraction.error
-                result["error"] = extraction.error
-            
-            self.db.commit()
-            
-        except Exception as e:
-            doc.ocr_status = OCRStatus.FAILED
-            doc.ocr_error = str(e)
-            result["error"] = str(e)
-            self.db.commit()
+                raise ValueError("Document content not available")
         
-        return result
+        return content
+    
+    def _apply_extraction(self, doc_id: UUID, extraction: ExtractionResult, result: dict) -> dict:
+        """Fill the result entry from an extraction; returns the document's UPDATE values."""
+        if not extraction.success:
+            return self._mark_failed(doc_id, extraction.error, result)
+        
+        result["success"] = True
+        result["method"] = extraction.method.value
+        result["text_length"] = len(extraction.text)
+        result["page_count"] = extraction.page_count
+        return {
+            "id": doc_id,
+            "extracted_text": extraction.text,
+            "ocr_status": OCRStatus.COMPLETED,
+            "page_count": extraction.page_count,
+        }
+    
+    def _mark_failed(self, doc_id: UUID, error: Optional[str], result: dict) -> dict:
+        """Record a failed extraction in the result entry; returns UPDATE values."""
+        result["error"] = error
+        return {
+            "id": doc_id,
+            "ocr_status": OCRStatus.FAILED,
+            "ocr_error": error,
+        }
+    
+    def _write_updates(self, updates: list[dict]):
+        """One bulk UPDATE by primary key (executemany) for all documents; caller commits."""
+        if updates:
+            self.db.execute(update(TenderDocument), updates)
+    
+    def _release_claimed(self, doc_ids: list[UUID], error: str):
+        """
+        Roll back and mark every claimed document FAILED, so a write error
+        doesn't leave them PROCESSING (the queue only picks up PENDING).
+        """
+        self.db.rollback()
+        if doc_ids:
+            self.db.execute(
+                update(TenderDocument)
+                .where(TenderDocument.id.in_(doc_ids))
+                .values(ocr_status=OCRStatus.FAILED, ocr_error=f"Extraction aborted: {error}")
+            )
+        self.db.commit()
     
     def _download_document(self, url: str) -> bytes:
         """Download document from URL."""
@@ -141,19 +223,27 @@ class ExtractionDBService:
         response.raise_for_status()
         return response.content
     
-    def process_pending_documents(self, limit: int = 50) -> dict:
+    def process_pending_documents(self, limit: int = 50, max_workers: int = 1) -> dict:
         """
         Process all documents with pending OCR status.
         
+        With max_workers > 1 the extraction itself runs in a process pool
+        (it is CPU-bound); content loading and DB writes stay here. Either
+        way results are written with one bulk UPDATE and a single commit;
+        if that fails, every claimed document is marked FAILED.
+        
         Args:
             limit: Maximum documents to process
+            max_workers: Extraction processes (1 = in this process)
             
         Returns:
             Summary of results
         """
-        pending_docs = self.db.query(TenderDocument).filter(
+        pending_docs = self.db.query(TenderDocument).options(
+            joinedload(TenderDocument.tender)
+        ).filter(
             TenderDocument.ocr_status == OCRStatus.PENDING
-        ).limit(limit).all()
+        ).order_by(TenderDocument.created_at).limit(limit).all()
         
         results = {
             "total": len(pending_docs),
@@ -162,12 +252,61 @@ class ExtractionDBService:
             "documents": [],
         }
         
+        # Claim the batch, loading content while we have the rows
+        # Plain ids/filenames: the claim commit expires the ORM rows
+        jobs = []  # (doc id, filename, result entry, content)
+        updates = []
         for doc in pending_docs:
-            tender = doc.tender
-            doc_result = self._process_document(tender.reference, doc)
-            results["documents"].append(doc_result)
-            
-            if doc_result["success"]:
+            result = self._new_result(doc.id, doc.filename)
+            results["documents"].append(result)
+            try:
+                content = self._load_content(doc.tender.reference, doc.filename, doc.download_url)
+            except Exception as e:
+                updates.append(self._mark_failed(doc.id, str(e), result))
+                continue
+            doc.ocr_status = OCRStatus.PROCESSING
+            jobs.append((doc.id, doc.filename, result, content))
+        self.db.commit()
+        
+        worker_error = None
+        if max_workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+                extractions = pool.map(
+                    _extract_in_worker,
+                    [(content, filename) for _, filename, _, content in jobs]
+                )
+                done = 0
+                try:
+                    for extraction in extractions:
+                        doc_id, _, result, _ = jobs[done]
+                        updates.append(self._apply_extraction(doc_id, extraction, result))
+                        done += 1
+                except Exception as e:
+                    # A dead worker (OOM, segfault -> BrokenProcessPool): don't leave
+                    # the claimed documents PROCESSING, the queue only picks PENDING
+                    for doc_id, _, result, _ in jobs[done:]:
+                        updates.append(self._mark_failed(doc_id, f"Extraction worker failed: {e}", result))
+                    worker_error = e
+        else:
+            for doc_id, filename, result, content in jobs:
+                try:
+                    with _extraction_slots:
+                        extraction = self.extractor.extract(content, filename)
+                    updates.append(self._apply_extraction(doc_id, extraction, result))
+                except Exception as e:
+                    updates.append(self._mark_failed(doc_id, str(e), result))
+        
+        try:
+            self._write_updates(updates)
+            self.db.commit()
+        except Exception as e:
+            self._release_claimed([doc_id for doc_id, _, _, _ in jobs], str(e))
+            raise
+        if worker_error:
+            raise worker_error
+        
+        for result in results["documents"]:
+            if result["success"]:
                 results["success"] += 1
             else:
                 results["failed"] += 1
@@ -0,0 +1,64 @@
+"""
+TenderField storage shared by the AI services.
+
+Both Avis extraction and deep analysis write their results as named fields
+with provenance, upserted by (tender_id, field_name).
+"""
+
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.tender import TenderField, FieldSource, UTC_NOW
+
+
+def field_row(
+    field_name: str,
+    field_value: str,
+    field_type: str,
+    source: FieldSource,
+    confidence: float,
+    document_id: Optional[str],
+    source_location: Optional[str]
+) -> dict:
+    """One field with provenance, as a TenderField mapping."""
+    return {
+        "field_name": field_name,
+        "field_value": field_value,
+        "field_type": field_type,
+        "source": source,
+        "confidence": confidence,
+        "document_id": UUID(document_id) if document_id else None,
+        "source_location": source_location,
+    }
+
+
+def store_fields(db: Session, tender_id: UUID, rows: list[dict]):
+    """
+    Upsert the tender's fields by name in one statement; caller commits.
+    
+    INSERT ... ON CONFLICT (tender_id, field_name) DO UPDATE. An update
+    keeps the stored document_id when the new field has none.
+    """
+    if not rows:
+        return
+    
+    stmt = pg_insert(TenderField).values(
+        [{**row, "id": uuid4(), "tender_id": tender_id} for row in rows]
+    )
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[TenderField.tender_id, TenderField.field_name],
+        set_={
+            "field_value": excluded.field_value,
+            "field_type": excluded.field_type,
+            "source": excluded.source,
+            "confidence": excluded.confidence,
+            "source_location": excluded.source_location,
+            "document_id": func.coalesce(excluded.document_id, TenderField.document_id),
+            "updated_at": UTC_NOW,
+        }
+    ))
@@ -5,10 +5,12 @@ Uses Playwright for browser automation.
 User can replace/extend the scraping logic in this file.
 """
 
+from __future__ import annotations
+
 import asyncio
 import re
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import AsyncIterator, Optional
 from dataclasses import dataclass, field
 from uuid import uuid4
 
@@ -65,30 +67,54 @@ class TenderScraper:
     Usage:
         scraper = TenderScraper()
         result = await scraper.scrape(target_date=datetime.now() - timedelta(days=1))
+    
+    Long-running processes should inject the shared browser:
+        scraper = TenderScraper(browser=await browser_pool.get_browser())
     """
     
     BASE_URL = "https://www.marchespublics.gov.ma"
     SEARCH_URL = f"{BASE_URL}/pmmp/spages/Appel_Offre.aspx"
     
-    def __init__(self, headless: bool = True, timeout: int = 30000):
+    def __init__(
+        self,
+        headless: bool = True,
+        timeout: int = 30000,
+        browser: Optional[Browser] = None
+    ):
+        """
+        Args:
+            headless: Launch mode when no browser is injected
+            timeout: Default page timeout (ms)
+            browser: Shared browser (e.g. from browser_pool); when given, each
+                scrape only opens/closes its own context
+        """
         if not PLAYWRIGHT_AVAILABLE:
             raise ImportError(
                 "Playwright is not installed. Run: pip install playwright && playwright install chromium"
             )
         self.headless = headless
         self.timeout = timeout
-        self._browser: Optional[Browser] = None
+        self._browser: Optional[Browser] = browser
+        self._owns_browser = browser is None
+        self._playwright = None
     
     async def _init_browser(self):
-        """Initialize Playwright browser."""
-        playwright = await async_playwright().start()
-        self._browser = await playwright.chromium.launch(headless=self.headless)
+        """Initialize Playwright browser (only when none was injected)."""
+        if not self._owns_browser:
+            return
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
     
     async def _close_browser(self):
-        """Close browser."""
+        """Close browser and Playwright if this scraper launched them."""
+        if not self._owns_browser:
+            return
         if self._browser:
             await self._browser.close()
             self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
     
     async def scrape(
         self,
@@ -112,14 +138,52 @@ class TenderScraper:
         if target_date is None:
             target_date = datetime.now() - timedelta(days=1)
         
-        tenders: list[ScrapedTender] = []
         errors: list[str] = []
+        tenders = [
+            tender
+            async for tender in self.iter_tenders(target_date, category, max_pages, errors)
+        ]
         
+        duration = (datetime.now() - start_time).total_seconds()
+        
+        return ScrapeResult(
+            success=len(errors) == 0,
+            tenders=tenders,
+            errors=errors,
+            scraped_at=datetime.now(),
+            target_date=target_date,
+            duration_seconds=duration
+        )
+    
+    async def iter_tenders(
+        self,
+        target_date: Optional[datetime] = None,
+        category: str = "Fournitures",
+        max_pages: int = 10,
+        errors: Optional[list[str]] = None
+    ) -> AsyncIterator[ScrapedTender]:
+        """
+        Yield tenders one at a time, documents already downloaded.
+        
+        Results pages are read on one tab and detail pages on another, so
+        each tender can be stored or saved (and dropped) before the next
+        results page is read. Failures are appended to `errors`.
+        """
+        if target_date is None:
+            target_date = datetime.now() - timedelta(days=1)
+        if errors is None:
+            errors = []
+        
+        context = None
         try:
             await self._init_browser()
             
-            page = await self._browser.new_page()
+            # Fresh context per scrape: isolated cookies/storage, cheap to create
+            context = await self._browser.new_context()
+            page = await context.new_page()
             page.set_default_timeout(self.timeout)
+            detail_page = await context.new_page()
+            detail_page.set_default_timeout(self.timeout)
             
             # Navigate to search page
             await page.goto(self.SEARCH_URL)
@@ -131,7 +195,14 @@ class TenderScraper:
             page_num = 1
             while page_num <= max_pages:
                 page_tenders, has_next = await self._scrape_page(page, target_date)
-                tenders.extend(page_tenders)
+                
+                # Download documents for each tender (in memory)
+                for tender in page_tenders:
+                    try:
+                        await self._download_documents(detail_page, tender)
+                    except Exception as e:
+                        errors.append(f"Failed to download docs for {tender.reference}: {str(e)}")
+                    yield tender
                 
                 if not has_next:
                     break
@@ -140,30 +211,12 @@ class TenderScraper:
                 await self._goto_next_page(page, page_num + 1)
                 page_num += 1
             
-            # Download documents for each tender (in memory)
-            for tender in tenders:
-                try:
-                    await self._download_documents(page, tender)
-                except Exception as e:
-                    errors.append(f"Failed to download docs for {tender.reference}: {str(e)}")
-            
-            await page.close()
-            
         except Exception as e:
             errors.append(f"Scraping failed: {str(e)}")
         finally:
+            if context is not None:
+                await context.close()
             await self._close_browser()
-        
-        duration = (datetime.now() - start_time).total_seconds()
-        
-        return ScrapeResult(
-            success=len(errors) == 0,
-            tenders=tenders,
-            errors=errors,
-            scraped_at=datetime.now(),
-            target_date=target_date,
-            duration_seconds=duration
-        )
     
     async def _apply_filters(self, page: Page, target_date: datetime, category: str):
         """
@@ -299,11 +352,78 @@ class TenderScraper:
         return 'other'
 
 
+class BrowserPool:
+    """
+    Process-wide Playwright + Chromium, launched lazily and reused.
+    
+    One browser per headless mode; scrapers get isolated contexts from it.
+    """
+    
+    def __init__(self):
+        self._playwright = None
+        self._browsers: dict[bool, Browser] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def get_browser(self, headless: bool = True) -> Browser:
+        """Return the shared browser, starting Playwright/Chromium on first use."""
+        if not PLAYWRIGHT_AVAILABLE:
+            raise ImportError(
+                "Playwright is not installed. Run: pip install playwright && playwright install chromium"
+            )
+        
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Playwright objects are bound to the loop that created them
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._playwright = None
+            self._browsers = {}
+        
+        async with self._lock:
+            browser = self._browsers.get(headless)
+            if browser is not None and browser.is_connected():
+                return browser
+            
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            browser = await self._playwright.chromium.launch(headless=headless)
+            self._browsers[headless] = browser
+            return browser
+    
+    async def close(self):
+        """Close all browsers and stop Playwright (application shutdown)."""
+        for browser in self._browsers.values():
+            if browser.is_connected():
+                await browser.close()
+        self._browsers = {}
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+browser_pool = BrowserPool()
+
+
 # Convenience function for CLI usage
 async def run_scraper(
     target_date: Optional[datetime] = None,
     headless: bool = True
 ) -> ScrapeResult:
-    """Run the scraper with given parameters."""
-    scraper = TenderScraper(headless=headless)
+    """Run the scraper with given parameters (shares the pooled browser)."""
+    browser = await browser_pool.get_browser(headless=headless)
+    scraper = TenderScraper(browser=browser)
     return await scraper.scrape(target_date=target_date)
+
+
+async def iter_scraper(
+    target_date: Optional[datetime] = None,
+    category: str = "Fournitures",
+    headless: bool = True,
+    errors: Optional[list[str]] = None
+) -> AsyncIterator[ScrapedTender]:
+    """Streaming counterpart of run_scraper: yields tenders as they are scraped."""
+    browser = await browser_pool.get_browser(headless=headless)
+    scraper = TenderScraper(browser=browser)
+    async for tender in scraper.iter_tenders(target_date=target_date, category=category, errors=errors):
+        yield tender
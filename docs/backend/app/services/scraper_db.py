@@ -3,11 +3,20 @@ Database integration for scraper results.
 Stores scraped tenders and documents in PostgreSQL.
 """
 
+import hashlib
+import mmap
+import tempfile
+import zlib
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from threading import Lock
+from typing import Iterable, Optional, Union
 from uuid import uuid4
+from sqlalchemy import func, insert, literal_column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.models import (
     Tender,
     TenderDocument,
@@ -17,6 +26,7 @@ from app.models import (
     OCRStatus,
     ProcessingStatus
 )
+from app.models.tender import UTC_NOW
 from app.services.scraper import ScrapedTender, ScrapedDocument, ScrapeResult
 
 
@@ -28,7 +38,25 @@ class ScraperDBService:
     
     def save_scrape_result(self, result: ScrapeResult) -> dict:
         """
-        Save all scraped tenders to database.
+        Save all scraped tenders to database (see save_tenders).
+        
+        Returns:
+            Summary dict with counts
+        """
+        summary = self.save_tenders(result.tenders)
+        summary["total_scraped"] = len(result.tenders)
+        summary["scrape_errors"] = result.errors
+        return summary
+    
+    def save_tenders(self, tenders: list[ScrapedTender]) -> dict:
+        """
+        Save one batch of scraped tenders to database.
+        
+        Tenders are upserted with one INSERT ... ON CONFLICT (reference)
+        DO UPDATE; RETURNING tells new rows (xmax = 0) from updated ones.
+        Processing states for new tenders and unseen documents follow as
+        two batched INSERTs, then everything is committed once (one
+        transaction, asynchronous commit).
         
         Returns:
             Summary dict with counts
@@ -38,107 +66,176 @@ class ScraperDBService:
         skipped = 0
         errors = []
         
-        for scraped_tender in result.tenders:
+        # Bulk load: don't wait for the WAL flush on commit. A crash can lose
+        # this batch (never corrupt it); the next scrape re-creates it.
+        self.db.execute(text("SET LOCAL synchronous_commit TO OFF"))
+        
+        rows_by_ref: dict[str, dict] = {}
+        scraped_by_ref: dict[str, list[ScrapedTender]] = {}
+        duplicates = 0
+        
+        for scraped_tender in tenders:
             try:
-                existing = self.db.query(Tender).filter(
-                    Tender.reference == scraped_tender.reference
-                ).first()
-                
-                if existing:
-                    # Update existing tender
-                    self._update_tender(existing, scraped_tender)
-                    updated += 1
+                pending = rows_by_ref.get(scraped_tender.reference)
+                if pending:
+                    # Same reference twice in one scrape: later data wins
+                    self._update_tender_row(pending, scraped_tender)
+                    duplicates += 1
                 else:
-                    # Create new tender
-                    self._create_tender(scraped_tender)
-                    created += 1
-                    
+                    rows_by_ref[scraped_tender.reference] = self._tender_row(scraped_tender)
+                scraped_by_ref.setdefault(scraped_tender.reference, []).append(scraped_tender)
             except Exception as e:
                 errors.append(f"Error saving {scraped_tender.reference}: {str(e)}")
                 skipped += 1
         
-        self.db.commit()
+        try:
+            state_rows: list[dict] = []
+            document_rows: list[dict] = []
+            
+            if rows_by_ref:
+                # One multi-VALUES upsert per page (stays under the bind-parameter limit)
+                tender_rows = list(rows_by_ref.values())
+                page_size = settings.db_insert_page_size
+                upserted = []
+                for start in range(0, len(tender_rows), page_size):
+                    upserted.extend(self.db.execute(
+                        self._upsert_tenders(tender_rows[start:start + page_size])
+                    ).all())
+                
+                now = datetime.utcnow()
+                ids_by_ref = {}
+                existing_ids = []
+                for tender_id, reference, inserted in upserted:
+                    ids_by_ref[reference] = tender_id
+                    if inserted:
+                        state_rows.append(self._processing_state_row(tender_id, now))
+                        created += 1
+                    else:
+                        existing_ids.append(tender_id)
+                updated = len(existing_ids) + duplicates
+                
+                # Only documents not already attached (by download URL)
+                known_urls = self._get_document_urls(existing_ids)
+                for reference, scraped_tenders in scraped_by_ref.items():
+                    tender_id = ids_by_ref[reference]
+                    urls = known_urls.setdefault(tender_id, set())
+                    for scraped_tender in scraped_tenders:
+                        for doc in scraped_tender.documents:
+                            if doc.download_url not in urls:
+                                urls.add(doc.download_url)
+                                document_rows.append(self._document_row(tender_id, doc))
+            
+            # States and documents reference tenders.id
+            if state_rows:
+                self.db.execute(insert(ProcessingState), state_rows)
+            if document_rows:
+                self.db.execute(insert(TenderDocument), document_rows)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            errors.append(f"Error saving scrape batch: {str(e)}")
+            skipped += len(rows_by_ref) + duplicates
+            created = 0
+            updated = 0
         
         return {
             "created": created,
             "updated": updated,
             "skipped": skipped,
-            "errors": errors,
-            "total_scraped": len(result.tenders),
-            "scrape_errors": result.errors
+            "errors": errors
         }
     
-    def _create_tender(self, scraped: ScrapedTender) -> Tender:
-        """Create new tender from scraped data."""
-        tender = Tender(
-            id=uuid4(),
-            reference=scraped.reference,
-            title=scraped.title,
-            organization=scraped.organization,
-            category=scraped.category,
-            publication_date=scraped.publication_date,
-            deadline=scraped.deadline,
-            opening_date=scraped.opening_date,
-            budget_estimate=scraped.budget_estimate,
-            caution_amount=scraped.caution_amount,
-            status=TenderStatus.OPEN,
-            source_url=scraped.source_url,
-            source_id=scraped.source_id,
-        )
-        self.db.add(tender)
-        self.db.flush()  # Get tender.id
+    def _upsert_tenders(self, rows: list[dict]):
+        """
+        Multi-row upsert keyed on reference, returning (id, reference, inserted).
         
-        # Create processing state
-        processing_state = ProcessingState(
-            id=uuid4(),
-            tender_id=tender.id,
-            status=ProcessingStatus.PENDING,
-            current_step="scraped",
-            progress=10.0,
-            scraping_completed_at=datetime.utcnow()
+        On conflict only deadline, budget and opening date are refreshed,
+        and only when the scrape has a value for them.
+        """
+        stmt = pg_insert(Tender).values(rows)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Tender.reference],
+            set_={
+                "deadline": func.coalesce(excluded.deadline, Tender.deadline),
+                "budget_estimate": func.coalesce(
+                    func.nullif(excluded.budget_estimate, 0), Tender.budget_estimate
+                ),
+                "opening_date": func.coalesce(excluded.opening_date, Tender.opening_date),
+                "updated_at": UTC_NOW,
+            }
         )
-        self.db.add(processing_state)
-        
-        # Add documents (metadata only - content in memory)
-        for doc in scraped.documents:
-            self._create_document(tender.id, doc)
+        return stmt.returning(
+            Tender.id,
+            Tender.reference,
+            (literal_column("xmax") == 0).label("inserted")
+        )
+    
+    def _get_document_urls(self, tender_ids: list) -> dict:
+        """Download URLs already stored, keyed by tender id."""
+        urls: dict = {}
+        if not tender_ids:
+            return urls
         
-        return tender
+        rows = self.db.query(
+            TenderDocument.tender_id, TenderDocument.download_url
+        ).filter(
+            TenderDocument.tender_id.in_(tender_ids)
+        ).all()
+        for tender_id, download_url in rows:
+            urls.setdefault(tender_id, set()).add(download_url)
+        return urls
+    
+    def _tender_row(self, scraped: ScrapedTender) -> dict:
+        """Insert row for a new tender."""
+        return {
+            "id": uuid4(),
+            "reference": scraped.reference,
+            "title": scraped.title,
+            "organization": scraped.organization,
+            "category": scraped.category,
+            "publication_date": scraped.publication_date,
+            "deadline": scraped.deadline,
+            "opening_date": scraped.opening_date,
+            "budget_estimate": scraped.budget_estimate,
+            "caution_amount": scraped.caution_amount,
+            "status": TenderStatus.OPEN,
+            "source_url": scraped.source_url,
+            "source_id": scraped.source_id,
+        }
+    
+    def _processing_state_row(self, tender_id, scraped_at: datetime) -> dict:
+        """Insert row for a new tender's processing state."""
+        return {
+            "id": uuid4(),
+            "tender_id": tender_id,
+            "status": ProcessingStatus.PENDING,
+            "current_step": "scraped",
+            "progress": 10.0,
+            "scraping_completed_at": scraped_at,
+        }
+    
+    def _document_row(self, tender_id, doc: ScrapedDocument) -> dict:
+        """Insert row for a document (metadata only - content in memory)."""
+        return {
+            "id": uuid4(),
+            "tender_id": tender_id,
+            "filename": doc.filename,
+            "file_type": self._map_file_type(doc.file_type),
+            "file_size": doc.file_size,
+            "file_path": None,  # No disk storage
+            "download_url": doc.download_url,
+            "ocr_status": OCRStatus.PENDING,
+        }
     
-    def _update_tender(self, tender: Tender, scraped: ScrapedTender):
-        """Update existing tender with new scraped data."""
-        # Only update fields that might have changed
+    def _update_tender_row(self, row: dict, scraped: ScrapedTender):
+        """Same rules as the upsert's ON CONFLICT update, for a row not yet inserted."""
         if scraped.deadline:
-            tender.deadline = scraped.deadline
+            row["deadline"] = scraped.deadline
         if scraped.budget_estimate:
-            tender.budget_estimate = scraped.budget_estimate
+            row["budget_estimate"] = scraped.budget_estimate
         if scraped.opening_date:
-            tender.opening_date = scraped.opening_date
-        
-        tender.updated_at = datetime.utcnow()
-        
-        # Check for new documents
-        existing_urls = {doc.download_url for doc in tender.documents}
-        for doc in scraped.documents:
-            if doc.download_url not in existing_urls:
-                self._create_document(tender.id, doc)
-    
-    def _create_document(self, tender_id, doc: ScrapedDocument) -> TenderDocument:
-        """Create document record (metadata only)."""
-        doc_type = self._map_file_type(doc.file_type)
-        
-        document = TenderDocument(
-            id=uuid4(),
-            tender_id=tender_id,
-            filename=doc.filename,
-            file_type=doc_type,
-            file_size=doc.file_size,
-            file_path=None,  # No disk storage
-            download_url=doc.download_url,
-            ocr_status=OCRStatus.PENDING,
-        )
-        self.db.add(document)
-        return document
+            row["opening_date"] = scraped.opening_date
     
     def _map_file_type(self, file_type: str) -> DocumentType:
         """Map string file type to enum."""
@@ -150,51 +247,207 @@ class ScraperDBService:
         return mapping.get(file_type.lower(), DocumentType.OTHER)
 
 
+# Accepted document content: bytes, or any buffer (bytearray, memoryview)
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Payloads that are already deflate/JPEG/PNG-coded: compressing again wastes CPU
+_PRECOMPRESSED_MAGIC = (
+    b"%PDF",  # PDF streams are usually Flate-encoded
+    b"PK\x03\x04",  # zip: docx, xlsx, odt
+    b"\x1f\x8b",  # gzip
+    b"\x89PNG",
+    b"\xff\xd8\xff",  # JPEG
+    b"Rar!",
+    b"7z\xbc\xaf",
+)
+
+
+@dataclass(slots=True)
+class _StoredDocument:
+    """Where and how one document's bytes are kept."""
+    data: Optional[bytes]  # inline payload; None when spilled
+    offset: int  # spill file offset
+    length: int  # stored (possibly compressed) length
+    raw_size: int  # original length
+    compressed: bool
+    digest: bytes  # sha256 of the original bytes
+    refs: int = 1  # keys sharing this entry (identical content)
+
+
 # In-memory document store for current scrape session
 class InMemoryDocumentStore:
     """
     Temporary in-memory storage for downloaded documents.
     Documents are stored here during scraping and can be
     passed to OCR without disk writes.
+    
+    Compressible payloads (HTML, XML, text, legacy .doc/.xls) are zlib
+    compressed; PDFs, zip-based Office files and images are kept as-is.
+    Documents of `spill_threshold` stored bytes or more are appended to an
+    anonymous temp file read through mmap, so bulk PDF bytes live in the
+    OS page cache (evictable) instead of the Python heap. The spill file
+    is append-only: space is reclaimed on clear().
+    
+    Identical content (same SHA-256) is stored once and shared by every
+    key that holds it; sizes count each distinct payload once.
     """
     
-    def __init__(self):
-        self._store: dict[str, bytes] = {}  # reference -> content
+    def __init__(self, spill_threshold: int = 0, compress_min_bytes: int = 1024):
+        self._store: dict[tuple[str, str], _StoredDocument] = {}  # (reference, filename) -> entry
+        self._by_tender: dict[str, dict[str, int]] = {}  # reference -> {filename: size}
+        self._by_hash: dict[bytes, _StoredDocument] = {}  # sha256 -> shared entry
+        self._spill_threshold = spill_threshold
+        self._compress_min_bytes = compress_min_bytes
+        self._spill_file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._tail = 0
+        self._size = 0
+        self._raw_size = 0
+        self._lock = Lock()  # extraction reads from threadpool workers
+    
+    def _encode(self, content: memoryview) -> tuple[BytesLike, bool]:
+        """Compress when it pays off; returns (payload, compressed)."""
+        if content.nbytes < self._compress_min_bytes or bytes(content[:8]).startswith(_PRECOMPRESSED_MAGIC):
+            return content, False
+        packed = zlib.compress(content, 3)
+        if len(packed) < content.nbytes * 0.9:
+            return packed, True
+        return content, False
     
-    def store(self, reference: str, filename: str, content: bytes):
+    def _put(self, reference: str, filename: str, content: BytesLike):
+        """Store one document; caller holds the lock."""
+        key = (reference, filename)
+        self._discard(reference, filename)
+        
+        # Hash, compress and spill straight from the caller's buffer
+        content = memoryview(content).cast("B")
+        digest = hashlib.sha256(content).digest()
+        entry = self._by_hash.get(digest)
+        if entry is not None:
+            # Same bytes already stored (e.g. an RC/CPS reattached): share them
+            entry.refs += 1
+            self._store[key] = entry
+            self._by_tender.setdefault(reference, {})[filename] = entry.raw_size
+            return
+        
+        payload, compressed = self._encode(content)
+        entry = _StoredDocument(
+            data=payload,
+            offset=0,
+            length=len(payload),
+            raw_size=content.nbytes,
+            compressed=compressed,
+            digest=digest
+        )
+        
+        if self._spill_threshold and entry.length >= self._spill_threshold:
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile()
+            self._spill_file.seek(self._tail)
+            self._spill_file.write(payload)
+            self._spill_file.flush()
+            entry.data = None
+            entry.offset = self._tail
+            self._tail += entry.length
+            # Remap to cover the grown file
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._spill_file.fileno(), self._tail, access=mmap.ACCESS_READ)
+        elif isinstance(payload, memoryview):
+            # Kept inline: hold the caller's bytes object itself (no copy);
+            # other buffers may be mutable, so those are copied once
+            whole_bytes = isinstance(payload.obj, bytes) and payload.nbytes == len(payload.obj)
+            entry.data = payload.obj if whole_bytes else payload.tobytes()
+        
+        self._store[key] = entry
+        self._by_hash[digest] = entry
+        self._size += entry.length
+        self._raw_size += entry.raw_size
+        self._by_tender.setdefault(reference, {})[filename] = entry.raw_size
+    
+    def _read(self, entry: _StoredDocument) -> bytes:
+        """Resolve a stored entry to the original bytes; caller holds the lock."""
+        if entry.data is None:
+            payload = self._mmap[entry.offset:entry.offset + entry.length]
+        else:
+            payload = entry.data
+        return zlib.decompress(payload) if entry.compressed else payload
+    
+    def _discard(self, reference: str, filename: str):
+        """Drop one document and its sizes; caller holds the lock."""
+        entry = self._store.pop((reference, filename), None)
+        if entry is not None:
+            entry.refs -= 1
+            if entry.refs == 0:
+                del self._by_hash[entry.digest]
+                self._size -= entry.length
+                self._raw_size -= entry.raw_size
+            files = self._by_tender.get(reference)
+            if files is not None:
+                files.pop(filename, None)
+                if not files:
+                    del self._by_tender[reference]
+    
+    def store(self, reference: str, filename: str, content: BytesLike):
         """Store document content."""
-        key = f"{reference}:{filename}"
-        self._store[key] = content
+        with self._lock:
+            self._put(reference, filename, content)
+    
+    def store_many(self, items: Iterable[tuple[str, str, BytesLike]]):
+        """Store many (reference, filename, content) documents under one lock."""
+        with self._lock:
+            for reference, filename, content in items:
+                self._put(reference, filename, content)
     
     def get(self, reference: str, filename: str) -> Optional[bytes]:
         """Retrieve document content."""
-        key = f"{reference}:{filename}"
-        return self._store.get(key)
+        with self._lock:
+            entry = self._store.get((reference, filename))
+            return self._read(entry) if entry is not None else None
     
     def get_all_for_tender(self, reference: str) -> dict[str, bytes]:
         """Get all documents for a tender."""
-        prefix = f"{reference}:"
-        return {
-            k.split(":", 1)[1]: v 
-            for k, v in self._store.items() 
-            if k.startswith(prefix)
-        }
+        with self._lock:
+            return {
+                filename: self._read(self._store[(reference, filename)])
+                for filename in self._by_tender.get(reference, {})
+            }
+    
+    def list_tender_documents(self, reference: str) -> list[tuple[str, int]]:
+        """(filename, original size) for a tender, without touching content."""
+        with self._lock:
+            return list(self._by_tender.get(reference, {}).items())
     
     def clear(self):
         """Clear all stored documents."""
-        self._store.clear()
+        with self._lock:
+            self._store.clear()
+            self._by_tender.clear()
+            self._by_hash.clear()
+            self._size = 0
+            self._raw_size = 0
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._spill_file is not None:
+                self._spill_file.truncate(0)
+            self._tail = 0
     
     def clear_tender(self, reference: str):
         """Clear documents for a specific tender."""
-        prefix = f"{reference}:"
-        keys_to_delete = [k for k in self._store if k.startswith(prefix)]
-        for key in keys_to_delete:
-            del self._store[key]
+        with self._lock:
+            for filename in list(self._by_tender.get(reference, {})):
+                self._discard(reference, filename)
     
     @property
     def size(self) -> int:
-        """Total size in bytes."""
-        return sum(len(v) for v in self._store.values())
+        """Total stored size in bytes (after compression, duplicates once)."""
+        return self._size
+    
+    @property
+    def uncompressed_size(self) -> int:
+        """Total original size in bytes (duplicates once)."""
+        return self._raw_size
     
     @property
     def count(self) -> int:
@@ -203,4 +456,4 @@ class InMemoryDocumentStore:
 
 
 # Global document store instance
-document_store = InMemoryDocumentStore()
+document_store = InMemoryDocumentStore(spill_threshold=settings.document_spill_bytes)
@@ -0,0 +1,64 @@
+"""
+Token-budget truncation for LLM prompts.
+
+Uses tiktoken's cl100k_base encoding when available (an approximation of
+DeepSeek's tokenizer, far closer than a character count for Arabic text).
+Without it, falls back to CHARS_PER_TOKEN characters per token.
+"""
+
+from threading import Lock
+from typing import Any, Optional
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+CHARS_PER_TOKEN = 4
+
+# A token is never anywhere near this long on average, so only this much of
+# the text needs encoding to find the cut point
+_MAX_CHARS_PER_TOKEN = 16
+
+_encoding: Optional[Any] = None
+_encoding_failed = False
+_encoding_lock = Lock()
+
+
+def _get_encoding():
+    """Load the encoding once; None if tiktoken is missing or can't load it."""
+    global _encoding, _encoding_failed
+    if not TIKTOKEN_AVAILABLE or _encoding_failed:
+        return None
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    # First load fetches the BPE file; offline hosts keep the fallback
+                    _encoding_failed = True
+    return _encoding
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    if len(text) * 4 <= max_tokens:
+        return text  # byte-level BPE: never more tokens than UTF-8 bytes
+
+    window = text[:max_tokens * _MAX_CHARS_PER_TOKEN]
+    ids = encoding.encode(window, disallowed_special=())
+    if len(ids) <= max_tokens:
+        return window
+    return encoding.decode(ids[:max_tokens])
+
+
+def max_kept_chars(max_tokens: int) -> int:
+    """Upper bound on the characters truncate_tokens keeps (fetch no more than this)."""
+    return max_tokens * max(CHARS_PER_TOKEN, _MAX_CHARS_PER_TOKEN)
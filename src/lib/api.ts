@@ -28,7 +28,6 @@ export interface TenderDocument {
   file_type: string;
   file_size: number;
   ocr_status: 'pending' | 'processing' | 'completed' | 'failed';
-  extracted_text?: string;
   download_url: string;
 }
 